@@ -0,0 +1,245 @@
+import operator
+from decimal import Decimal
+
+import numeric
+from base_types import *
+from tokens import WordKinds
+
+try:
+    import numpy
+except ImportError:  # Arrays are kept as tuples of values, without element-wise operators
+    numpy = None
+
+int64_min = -(1 << 63)
+int64_max = (1 << 63) - 1
+
+
+class NumberArray(Array):
+    # Array of numbers kept in a numpy array. The dtype is int64 when every element is an int that fits in it,
+    # float64 when every element is a float, bool for the results of comparisons, and object for everything else:
+    # Decimals, big ints and ints mixed with floats. Every element follows the rules of the number modes like a
+    # single number does, so ints stay ints: in int_float mode [1 2.5] is [1, 2.5] and [1 2 3] / 2 is [0.5, 1, 1.5]
+    __slots__ = ()
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return f'[{", ".join([i.__repr__() for i in self.elements])}]'
+
+    @property
+    def elements(self):  # The elements as values, made when they are needed
+        if self.value.dtype == bool:
+            return tuple(to_bool(item) for item in self.value.tolist())
+        return tuple(to_number(item) for item in self.value.tolist())
+
+
+def to_array(elements: list) -> Array:
+    # A NumberArray when numpy is there and every element is a number, an empty array is a NumberArray too
+    if numpy is None or not all(type(element) is Number for element in elements):
+        return Array(elements)
+
+    items = [element.value for element in elements]
+    return NumberArray(numpy.array(items, dtype=item_dtype(items)))
+
+
+def item_dtype(items: list):
+    if not items:  # The dtype the numbers of the mode would have
+        return numpy.int64 if numeric.current.integers else object
+    elif any(isinstance(item, Decimal) for item in items):
+        return object
+    elif any(type(item) is float for item in items):
+        return numpy.float64 if all(type(item) is float for item in items) else object
+    elif int64_min <= min(items) and max(items) <= int64_max:
+        return numpy.int64
+
+    return object
+
+
+# An operand is a numpy array or a number. Each operation converts both operands to one dtype, the way two numbers
+# are converted by the number modes: int with a float is a float, an int with a Decimal is a Decimal
+def operand_kind(item) -> str:
+    if isinstance(item, numpy.ndarray):
+        return item.dtype.kind
+    elif type(item) is int:
+        return 'i' if int64_min <= item <= int64_max else 'O'
+    elif type(item) is float:
+        return 'f'
+
+    return 'O'
+
+
+def common_kind(left, right) -> str:
+    kinds = operand_kind(left), operand_kind(right)
+    if 'b' in kinds:
+        return 'b'
+    elif 'O' in kinds:
+        return 'O'
+    elif 'f' in kinds:
+        return 'f'
+
+    return 'i'
+
+
+def as_objects(item):
+    if isinstance(item, numpy.ndarray):
+        return item.astype(object)
+    return item
+
+
+def max_abs(item) -> int:  # Largest absolute value of an int operand, as a Python int
+    if isinstance(item, numpy.ndarray):
+        return max(-int(item.min()), int(item.max())) if item.size else 0
+    return abs(item)
+
+
+def fits_int64(left, right, kind: int) -> bool:  # Whether an operator on two int operands can not overflow int64
+    if kind in (WordKinds.plus, WordKinds.minus):
+        return max_abs(left) + max_abs(right) <= int64_max
+    elif kind == WordKinds.star:
+        return max_abs(left) * max_abs(right) <= int64_max
+    elif kind == WordKinds.caret:
+        base = max_abs(left)
+        exponent = max_abs(right)
+        return base <= 1 or base.bit_length() * exponent < 63
+
+    return max_abs(left) < int64_max
+
+
+# The scalar operation of each operator kind, applied to every element of object arrays
+scalar_operations = {
+    WordKinds.plus: operator.add,
+    WordKinds.minus: operator.sub,
+    WordKinds.star: operator.mul,
+    WordKinds.slash: numeric.divide,
+    WordKinds.percent: numeric.remainder,
+    WordKinds.caret: numeric.power,
+    WordKinds.bigger: operator.gt,
+    WordKinds.smaller: operator.lt,
+    WordKinds.is_op: operator.eq,
+}
+comparison_kinds = WordKinds.bigger, WordKinds.smaller, WordKinds.is_op
+
+
+def apply_objects(left, right, kind: int):
+    result = numpy.frompyfunc(scalar_operations[kind], 2, 1)(as_objects(left), as_objects(right))
+    return result.astype(bool) if kind in comparison_kinds else result
+
+
+def apply_numbers(left, right, kind: int):
+    if kind == WordKinds.plus:
+        return numpy.add(left, right)
+    elif kind == WordKinds.minus:
+        return numpy.subtract(left, right)
+    elif kind == WordKinds.star:
+        return numpy.multiply(left, right)
+    elif kind == WordKinds.percent:
+        # fmod has the sign of left like numeric.remainder
+        return numpy.fmod(left, right)
+    elif kind == WordKinds.bigger:
+        return numpy.greater(left, right)
+    elif kind == WordKinds.smaller:
+        return numpy.less(left, right)
+    elif kind == WordKinds.is_op:
+        return numpy.equal(left, right)
+    elif kind == WordKinds.slash:
+        return numpy.true_divide(left, right)
+
+    return numpy.power(left, right)
+
+
+def apply_ints(left, right, kind: int):
+    if kind == WordKinds.slash:  # An exact quotient is an int, the others are fractions
+        quotient, remainder = numpy.divmod(left, right)
+        exact = numpy.equal(remainder, 0)
+        if exact.all():
+            return quotient
+        elif numeric.current.fraction is not float:
+            return apply_objects(left, right, kind)
+        elif not exact.any():
+            return numpy.true_divide(left, right)
+
+        result = numpy.true_divide(left, right).astype(object)
+        result[exact] = quotient[exact].astype(object)
+        return result
+
+    elif kind == WordKinds.caret and numpy.any(numpy.less(right, 0)):
+        # A negative exponent gives a fraction
+        if numeric.current.fraction is float and numpy.all(numpy.less(right, 0)):
+            return numpy.power(numpy.float64(left) if numpy.isscalar(left) else left.astype(numpy.float64), right)
+        return apply_objects(left, right, kind)
+
+    elif not fits_int64(left, right, kind):
+        return apply_objects(left, right, kind)
+
+    return apply_numbers(left, right, kind)
+
+
+def array_operation(kind: int):
+    def operation(left, right):
+        left = left.value
+        right = right.value
+        if isinstance(left, numpy.ndarray) and isinstance(right, numpy.ndarray) and left.shape != right.shape:
+            return shared_false if kind == WordKinds.is_op else None
+
+        common = common_kind(left, right)
+        if common == 'b':
+            return None
+
+        # Dividing by zero and overflows of floats fail like they do for single numbers
+        with numpy.errstate(all='raise'):
+            if common == 'O':
+                result = apply_objects(left, right, kind)
+            elif common == 'i':
+                result = apply_ints(left, right, kind)
+            else:
+                result = apply_numbers(left, right, kind)
+
+        return NumberArray(result)
+    return operation
+
+
+def negative_array(value):
+    items = value.value
+    if items.dtype == bool:
+        return None
+    elif items.dtype == object or (items.dtype == numpy.int64 and items.size and items.min() == int64_min):
+        return NumberArray(numpy.frompyfunc(operator.neg, 1, 1)(items.astype(object)))
+
+    return NumberArray(numpy.negative(items))
+
+
+def not_array(value):
+    items = value.value
+    if items.dtype == bool:
+        return NumberArray(numpy.logical_not(items))
+    elif items.dtype == object:
+        return NumberArray(numpy.frompyfunc(operator.not_, 1, 1)(items).astype(bool))
+
+    return NumberArray(numpy.equal(items, 0))
+
+
+def array_truth(value) -> bool:
+    return len(value.value) > 0
+
+
+def both_true_array(left, right):
+    return to_bool(left.value and array_truth(right))
+
+
+def any_true_array(left, right):
+    return to_bool(left.value or array_truth(right))
+
+
+if numpy is not None:
+    for op_kind in scalar_operations:
+        register_binary((NumberArray,), (op_kind,), (NumberArray, Number), array_operation(op_kind))
+        register_binary((Number,), (op_kind,), (NumberArray,), array_operation(op_kind))
+
+    # Like for the other arrays
+    register_binary((String,), (WordKinds.is_op,), (NumberArray,), different_types)
+    register_binary((Number, String), (WordKinds.and_op,), (NumberArray,), both_true_array)
+    register_binary((Number, String), (WordKinds.or_op,), (NumberArray,), any_true_array)
+
+    unary_operations[NumberArray, WordKinds.minus] = negative_array
+    unary_operations[NumberArray, WordKinds.not_op] = not_array
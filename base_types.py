@@ -1,395 +1,331 @@
-import copy
 import decimal
+import operator
 from decimal import Decimal
-from tokens import Position
-from errors import UnsupportedOperationException
 
-operators = [
-    '+', '-', '/', '*', '^', '%',
-    '>', '<', 'is', 'or', 'and'
-]
-
-unary_operators = [
-    '-', 'not'
-]
+import numeric
+from tokens import Position, WordKinds
 
 bool_values = 'true', 'false'
 bool_true = 'true'
 bool_false = 'false'
 null_value = 'null'
 special_vars = bool_true, bool_false, null_value
+special_kinds = WordKinds.true, WordKinds.false, WordKinds.null
+
+
+class TypeNames:
+    number_t = 'number'
+    string_t = 'string'
+    ref_t = 'reference'
+    func_t = 'function'
+    bool_t = 'bool'
+    array_t = 'array'
+    null_t = 'null'
+
 
+class Any:  # Values are never changed once they are made, so they are shared instead of copied
+    # A value has no positions, errors take them from the nodes of the code, so equal values can be one object
+    __slots__ = 'value',
+    type_name = None  # Set by each value type
 
-class Any:
-    def __init__(self, type_name: str, value, start_pos, end_pos):
-        self.type_name = type_name
+    def __init__(self, value):
         self.value = value
-        self.start_pos = start_pos
-        self.end_pos = end_pos
-        self.properties = Namespace()
 
     def __repr__(self):
         return f'{self.type_name}:{self.value}'
 
     def copy(self):
-        return Any(self.type_name, copy.copy(self.value), self.start_pos.copy(), self.end_pos.copy())
+        return self
 
-    # Base Operators
-    def operator_add(self, other): ...
+    @property
+    def properties(self):  # Shared by every value of the type, like the values themselves they are not changed
+        return properties_of(type(self))
 
-    def operator_sub(self, other): ...
 
-    def operator_mul(self, other): ...
+class Number(Any):
+    __slots__ = ()
+    type_name = TypeNames.number_t
 
-    def operator_div(self, other): ...
+    def __init__(self, value: Decimal | int | float):  # See numeric.NumberMode
+        self.value = value
 
-    def operator_mod(self, other): ...
 
-    def operator_pow(self, other): ...
+class String(Any):
+    __slots__ = ()
+    type_name = TypeNames.string_t
 
-    # Boolean operators
-    def operator_bigger(self, other): ...
+    def __init__(self, value: str):
+        self.value = value
 
-    def operator_smaller(self, other): ...
 
-    def operator_equal(self, other): ...
+class ReferenceType(Any):
+    __slots__ = ()
+    type_name = TypeNames.ref_t
 
-    def operator_or(self, other): ...
+    def __init__(self, name: str):
+        self.value = name
 
-    def operator_and(self, other): ...
+    @property
+    def name(self):
+        return self.value
 
-    def operator_unary_minus(self): ...
 
-    def operator_unary_not(self): ...
+class Null(Any):
+    __slots__ = ()
+    type_name = TypeNames.null_t
+    value = None
 
+    def __init__(self):
+        pass
 
-class Number(Any):
-    def __init__(self, value: Decimal, start_pos, end_pos):
-        super().__init__(TypeNames.number_t, value, start_pos, end_pos)
-
-    def operator_add(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value + other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_sub(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value - other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_mul(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value * other.value, self.start_pos, other.end_pos
-            )
-        # If number is multiplied by string
-        elif isinstance(other, String):
-            return String(
-                int(self.value) * other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_div(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value / other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_mod(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value % other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_pow(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value ** other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_bigger(self, other):
-        if isinstance(other, Number):
-            return Bool(
-                self.value > other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_smaller(self, other):
-        if isinstance(other, Number):
-            return Bool(
-                self.value < other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_equal(self, other):
-        if isinstance(other, Number):
-            return Bool(
-                self.value == other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return Bool(False, self.start_pos, other.end_pos)
+    def __repr__(self):
+        return null_value
 
-    def operator_and(self, other):
-        if isinstance(other, Any):
-            return Bool(bool(self.value) and bool(other.value), self.start_pos, other.end_pos)
-        else:
-            return None
 
-    def operator_or(self, other):
-        if isinstance(other, Any):
-            return Bool(bool(self.value) or bool(other.value), self.start_pos, other.end_pos)
-        else:
-            return None
+class Bool(Any):
+    __slots__ = ()
+    type_name = TypeNames.bool_t
 
-    def operator_unary_minus(self):
-        return Number(-self.value, self.start_pos, self.end_pos)
+    def __init__(self, value: bool):
+        self.value = value
 
-    def operator_unary_not(self):
-        return Bool(not self.value, self.start_pos, self.end_pos)
+    def __repr__(self):
+        return bool_true if self.value else bool_false
 
 
-class String(Any):
-    def __init__(self, value: str, start_pos, end_pos):
-        super().__init__(TypeNames.string_t, value, start_pos, end_pos)
-
-    def operator_add(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value + other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_sub(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value - other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_mul(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value * other.value, self.start_pos, other.end_pos
-            )
-        # If number is multiplied by string
-        elif isinstance(other, String):
-            return String(
-                int(self.value) * other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_div(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value / other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_mod(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value % other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_pow(self, other):
-        if isinstance(other, Number):
-            return Number(
-                self.value ** other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_bigger(self, other):
-        if isinstance(other, Number):
-            return Bool(
-                self.value > other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_smaller(self, other):
-        if isinstance(other, Number):
-            return Bool(
-                self.value < other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return UnsupportedOperationException(
-                f'Unsupported operation + between {self.type_name} and {other.type_name}',
-                self.start_pos, other.end_pos, 'when adding two objects'
-            )
-
-    def operator_equal(self, other):
-        if isinstance(other, Number):
-            return Bool(
-                self.value == other.value, self.start_pos, other.end_pos
-            )
-        else:
-            return Bool(False, self.start_pos, other.end_pos)
+class Array(Any):  # The elements are kept in a tuple, a changed array is a new array
+    __slots__ = ()
+    type_name = TypeNames.array_t
 
-    def operator_and(self, other):
-        if isinstance(other, Any):
-            return Bool(bool(self.value) and bool(other.value), self.start_pos, other.end_pos)
-        else:
-            return None
+    def __init__(self, value):
+        self.value = tuple(value)
 
-    def operator_or(self, other):
-        if isinstance(other, Any):
-            return Bool(bool(self.value) or bool(other.value), self.start_pos, other.end_pos)
-        else:
-            return None
+    def __repr__(self):
+        return f'[{", ".join([i.__repr__() for i in self.value])}]'
 
+    @property
+    def elements(self):
+        return self.value
 
-class ReferenceType(Any):
-    def __init__(self, name: str, start_pos, end_pos):
-        self.name = name
-        super().__init__(TypeNames.ref_t, name, start_pos, end_pos)
 
+# Properties every value of a type has, the namespace of a type is made when it is first needed. The properties
+# of Any are found from every type
+type_properties = {}
 
-class Null(Any):
-    def __init__(self, start_pos, end_pos):
-        super().__init__(TypeNames.null_t, None, start_pos, end_pos)
 
-    def __repr__(self):
-        return null_value
+def properties_of(value_type: type):
+    properties = type_properties.get(value_type)
+    if properties is None:
+        parent = properties_of(value_type.__base__) if value_type is not Any else None
+        properties = type_properties[value_type] = Namespace(parent=parent)
+    return properties
 
 
-class Bool(Any):
-    def __init__(self, value: bool, start_pos, end_pos):
-        super().__init__(TypeNames.bool_t, value, start_pos, end_pos)
+def to_bool(value) -> Bool:
+    return shared_true if value else shared_false
 
-    def __repr__(self):
-        return bool_true if self.value else bool_false
 
+decimal_one = Decimal(1)
 
-class Array(Any):
-    def __init__(self, value: list, start_pos, end_pos):
-        self.__list = value
-        super().__init__(TypeNames.array_t, value, start_pos, end_pos)
 
-    def __repr__(self):
-        return f'[{", ".join([i.__repr__() for i in self.__list])}]'
+def to_number(value) -> Number:
+    # Equal Decimals can be printed differently, like 2, 2.0 and -0, only the ones with exponent 0 are shared
+    if type(value) is int:
+        if -5 <= value <= 256:
+            return small_numbers[value + 5]
+    elif (type(value) is Decimal and value.same_quantum(decimal_one) and -5 <= value <= 256
+          and (value or not value.is_signed())):
+        return small_decimals[int(value) + 5]
+    return Number(value)
 
 
-class TypeNames:
-    number_t = 'number'
-    string_t = 'string'
-    ref_t = 'reference'
-    func_t = 'function'
-    bool_t = 'bool'
-    array_t = 'array'
-    null_t = 'null'
+# Operators, the function that applies one is looked up by the types of the operands and the operator kind
+binary_operations = {}  # (left type, operator kind, right type) -> function(left, right) that returns the result
+unary_operations = {}  # (type, operator kind) -> function(value)
+
+value_types = Any, Number, String, ReferenceType, Null, Bool, Array
+
+
+def register_binary(left_types, kinds, right_types, func):
+    for left_type in left_types:
+        for kind in kinds:
+            for right_type in right_types:
+                binary_operations[left_type, kind, right_type] = func
+
+
+def binary_operation(left: Any, kind: int, right: Any):  # None when the operator is not defined for the types
+    func = binary_operations.get((type(left), kind, type(right)))
+    return None if func is None else func(left, right)
+
+
+def unary_operation(kind: int, value: Any):
+    func = unary_operations.get((type(value), kind))
+    return None if func is None else func(value)
+
+
+def number_operation(apply, make_result):  # Applies apply to the values of two numbers
+    def operation(left, right):
+        return make_result(apply(left.value, right.value))
+    return operation
+
+
+def repeat_string(left, right):
+    return String(int(left.value) * right.value)
+
+
+def equal_values(left, right):
+    return to_bool(left.value == right.value)
+
+
+def different_types(left, right):
+    return shared_false
+
+
+def both_true(left, right):
+    return to_bool(left.value and right.value)
+
+
+def any_true(left, right):
+    return to_bool(left.value or right.value)
+
+
+def negative_number(value):
+    return to_number(-value.value)
+
+
+def not_number(value):
+    return to_bool(not value.value)
+
+
+for op_kind, apply in ((WordKinds.plus, operator.add), (WordKinds.minus, operator.sub), (WordKinds.star, operator.mul),
+                       (WordKinds.slash, numeric.divide), (WordKinds.percent, numeric.remainder),
+                       (WordKinds.caret, numeric.power)):
+    register_binary((Number,), (op_kind,), (Number,), number_operation(apply, to_number))
+
+for op_kind, apply in ((WordKinds.bigger, operator.gt), (WordKinds.smaller, operator.lt)):
+    register_binary((Number,), (op_kind,), (Number,), number_operation(apply, to_bool))
+
+register_binary((Number,), (WordKinds.star,), (String,), repeat_string)
+
+# Values of different types are never equal
+register_binary((Number, String), (WordKinds.is_op,), value_types, different_types)
+register_binary((Number,), (WordKinds.is_op,), (Number,), equal_values)
+register_binary((String,), (WordKinds.is_op,), (String,), equal_values)
+
+register_binary((Number, String), (WordKinds.and_op,), value_types, both_true)
+register_binary((Number, String), (WordKinds.or_op,), value_types, any_true)
+
+unary_operations[Number, WordKinds.minus] = negative_number
+unary_operations[Number, WordKinds.not_op] = not_number
 
 
 # Other
 class Variable:
+    __slots__ = 'name', 'value'
+
     def __init__(self, name: str, value: Any):
         self.name = name
         self.value = value
 
 
 class Constant:
+    __slots__ = 'name', '__value'
+
     def __init__(self, name: str, value: Any):
         self.name = name
         self.__value = value
 
     @property
     def value(self):
-        return self.__value.copy()
+        return self.__value
 
 
 class Function:
+    __slots__ = 'name', '__code', 'compiled', 'compiled_mode'
+
     def __init__(self, name: str, code: Any):
         self.name = name
         self.code = code
 
+    @property
+    def code(self):
+        return self.__code
+
+    @code.setter
+    def code(self, code: Any):  # A new body is compiled again on its first call
+        self.__code = code
+        self.compiled = None  # compiler.Code of each statement of the body, made by vm.VM on the first call
+        self.compiled_mode = None  # The numeric.NumberMode the literals of compiled were made in
+
 
 class Namespace:
+    # A scope, names that are not found in it are looked up in the parent scope. Assigning to a variable changes it
+    # in the scope it was found in, new variables and constants are added to this scope. Code is run in the number
+    # mode of the namespace, so every number in it is of one mode. A child scope has the mode of its parent
+    var_kind = 0
+    const_kind = 1
+    func_kind = 2
+
     def __init__(self, variables: list[Variable] = None, constants: list[Constant] = None,
-                 functions: list[Function] = None):
-        self.variables = variables or []
-        self.constants = constants or []
-        self.functions = functions or []
-
-    def __search_by_name(self, name: str, search_in):
-        for item in search_in:
-            if item.name == name:
-                return item
+                 functions: list[Function] = None, parent: 'Namespace' = None, numbers: numeric.NumberMode = None):
+        self.__names = {}  # Name -> [variable, constant, function], None for the kinds it is not
+        self.parent = parent
+
+        if parent is None:
+            self.numbers = numbers or numeric.default
+        elif numbers is None or numbers is parent.numbers:
+            self.numbers = parent.numbers
+        else:
+            raise ValueError(f'A scope in {parent.numbers} can not have a scope in {numbers}')
+
+        if variables or constants or functions:
+            for kind, items in (self.var_kind, variables), (self.const_kind, constants), (self.func_kind, functions):
+                for item in items or ():
+                    self.__add(item, kind)
+
+    def __add(self, item, kind: int):
+        entry = self.__names.get(item.name)
+        if entry is None:
+            entry = self.__names[item.name] = [None, None, None]
+        entry[kind] = item
+
+    def __items(self, kind: int) -> list:
+        return [entry[kind] for entry in self.__names.values() if entry[kind]]
+
+    @property
+    def variables(self) -> list[Variable]:
+        return self.__items(self.var_kind)
+
+    @property
+    def constants(self) -> list[Constant]:
+        return self.__items(self.const_kind)
+
+    @property
+    def functions(self) -> list[Function]:
+        return self.__items(self.func_kind)
+
+    def __search_by_name(self, name: str, kind: int):
+        scope = self
+        while scope is not None:
+            entry = scope.__names.get(name)
+            if entry:
+                if entry[kind]:
+                    return entry[kind]
+
+                # Declaring a constant removes the name from its scope, so the constant hides the outer ones
+                if entry[self.const_kind]:
+                    return None
+            scope = scope.parent
         return None
 
     def search_var_by_name(self, name: str):
-        return self.__search_by_name(name, self.variables)
+        return self.__search_by_name(name, self.var_kind)
 
     def search_const_by_name(self, name: str):
-        return self.__search_by_name(name, self.constants)
+        return self.__search_by_name(name, self.const_kind)
 
     def search_func_by_name(self, name: str):
-        return self.__search_by_name(name, self.functions)
+        return self.__search_by_name(name, self.func_kind)
 
     def search_by_name(self, name: str):
         return (
@@ -402,29 +338,37 @@ class Namespace:
     def exists(self, name: str):
         return True if self.search_by_name(name) else False
 
-    def remove_by_name(self, name: str):
-        s_var = self.search_var_by_name(name)
-        s_const = self.search_const_by_name(name)
-        s_func = self.search_func_by_name(name)
-
-        if s_var:
-            self.variables.remove(s_var)
-        if s_const:
-            self.constants.remove(s_const)
-        if s_func:
-            self.functions.remove(s_func)
+    def remove_by_name(self, name: str):  # Only from this scope
+        self.__names.pop(name, None)
 
     def add_var(self, var: Variable):
         if isinstance(var, Variable):
-            self.variables.append(var)
+            self.__add(var, self.var_kind)
         else:
             raise Exception
 
     def add_const(self, const: Constant):
         if isinstance(const, Constant):
-            self.constants.append(const)
+            self.__add(const, self.const_kind)
+        else:
+            raise Exception
+
+    def add_func(self, func: Function):
+        if isinstance(func, Function):
+            self.__add(func, self.func_kind)
         else:
             raise Exception
 
+    def child(self):  # A new empty scope inside this one, like the scope of a function call
+        return Namespace(parent=self)
+
     def copy(self):
-        return Namespace(self.variables.copy(), self.constants.copy(), self.functions.copy())
+        return Namespace(self.variables, self.constants, self.functions, self.parent, self.numbers)
+
+
+# Shared values, use these instead of making new ones
+shared_true = Bool(True)
+shared_false = Bool(False)
+shared_null = Null()
+small_numbers = [Number(i) for i in range(-5, 257)]
+small_decimals = [Number(Decimal(i)) for i in range(-5, 257)]
@@ -0,0 +1,106 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from decimal import Decimal
+
+import arrays
+import numeric
+from base_types import *
+from tokens import WordKinds
+
+operations = {
+    'array + array': (WordKinds.plus, False),
+    'array * number': (WordKinds.star, True),
+    'array / number': (WordKinds.slash, True),
+    'array % array': (WordKinds.percent, False),
+    'array > array': (WordKinds.bigger, False),
+}
+
+modes = {
+    'decimal': numeric.decimal_mode,
+    'int_float': numeric.int_float_mode,
+}
+
+
+def make_items(mode_name: str, size: int, offset: int):
+    if mode_name == 'decimal':
+        return [Decimal(i + offset) for i in range(size)]
+    return [i + offset for i in range(size)]
+
+
+def elementwise(left: Array, right, kind: int):  # What the operator costs with one value per element
+    if isinstance(right, Array):
+        pairs = zip(left.elements, right.elements)
+    else:
+        pairs = ((element, right) for element in left.elements)
+    return Array([binary_operation(a, kind, b) for a, b in pairs])
+
+
+def timed(func, repeat: int):
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def bench(name: str, mode_name: str, size: int, repeat: int):
+    kind, with_number = operations[name]
+    left_items = make_items(mode_name, size, 1)
+    right_items = make_items(mode_name, size, 3)
+
+    left = arrays.to_array([to_number(item) for item in left_items])
+    right = to_number(right_items[0]) if with_number else arrays.to_array([to_number(item) for item in right_items])
+    left_values = Array(left.elements)
+    right_values = right if with_number else Array(right.elements)
+
+    with modes[mode_name].use():
+        vector_seconds = timed(lambda: binary_operation(left, kind, right), repeat)
+        value_seconds = timed(lambda: elementwise(left_values, right_values, kind), repeat)
+
+    return {
+        'operation': name,
+        'mode': mode_name,
+        'size': size,
+        'dtype': str(left.value.dtype),
+        'numpy_seconds': vector_seconds,
+        'values_seconds': value_seconds,
+        'speedup': value_seconds / vector_seconds,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare numpy backed arrays with arrays of values')
+    parser.add_argument('--operation', action='append', choices=sorted(operations),
+                        help='operation to run, can be given more than once (default: all)')
+    parser.add_argument('--mode', action='append', choices=sorted(modes),
+                        help='number mode to run, can be given more than once (default: all)')
+    parser.add_argument('--size', type=int, default=1000000, help='elements of each array')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is reported')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    if arrays.numpy is None:
+        sys.exit('numpy is not installed, arrays are kept as tuples of values')
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'numpy': arrays.numpy.__version__,
+        'results': [bench(name, mode, args.size, args.repeat)
+                    for name in args.operation or operations for mode in args.mode or modes],
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
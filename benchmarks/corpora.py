@@ -0,0 +1,83 @@
+import random
+
+
+# Every generator returns a Well program of about size characters, built from whole lines
+
+
+def numeric(size: int, rng: random.Random, terms: int = 40):  # Long numeric expressions
+    lines = []
+    length = 0
+    while length < size:
+        parts = [str(rng.randint(0, 10 ** 6))]
+        for _ in range(terms):
+            number = f'{rng.randint(0, 10 ** 6):_}' if rng.random() < 0.3 else f'{rng.random() * 1000:.4f}'
+            parts.append(rng.choice('+-*/%^') + ' ' + number)
+        line = ' '.join(parts) + '\n'
+        lines.append(line)
+        length += len(line)
+    return ''.join(lines)
+
+
+def nested(size: int, rng: random.Random, depth: int = 12):  # Deeply nested (), [] and {} groups
+    lines = []
+    length = 0
+    while length < size:
+        line = f'x{rng.randint(0, 99)}'
+        for level in range(depth):
+            open_char, close_char = rng.choice(['()', '[]', '{}'])
+            line = f'{open_char}{level} + {line} * y{level}{close_char}'
+        line += '\n'
+        lines.append(line)
+        length += len(line)
+    return ''.join(lines)
+
+
+def strings(size: int, rng: random.Random):  # Single-line strings with escapes
+    words = ['hello', 'world', 'well', 'lexer', 'token', 'escape\\n', 'tab\\t', 'quote\\"', "it\\'s"]
+    lines = []
+    length = 0
+    while length < size:
+        quote = rng.choice('"\'')
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(2, 12)))
+        line = f'message_{len(lines)} = {quote}{text}{quote} + {quote}!{quote}\n'
+        lines.append(line)
+        length += len(line)
+    return ''.join(lines)
+
+
+def declarations(size: int, rng: random.Random):  # Many constant and variable declarations
+    lines = []
+    length = 0
+    while length < size:
+        value = rng.choice([str(rng.randint(0, 10 ** 9)), f'"value {len(lines)}"', 'true', 'false', 'null'])
+        keyword = 'const ' if rng.random() < 0.3 else ''
+        line = f'{keyword}name_{len(lines)}_{rng.randint(0, 999)} = {value}\n'
+        lines.append(line)
+        length += len(line)
+    return ''.join(lines)
+
+
+def multiline(size: int, rng: random.Random, lines_per_string: int = 20):  # Backtick multi-line strings
+    words = ['alpha', 'beta', 'gamma', 'delta', '\\`tick\\`', '"quoted"', "'single'", '(paren)', '[bracket]']
+    blocks = []
+    length = 0
+    while length < size:
+        body = '\n'.join(' '.join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+                         for _ in range(lines_per_string))
+        block = f'doc_{len(blocks)} = `{body}`\n'
+        blocks.append(block)
+        length += len(block)
+    return ''.join(blocks)
+
+
+corpora = {
+    'numeric': numeric,
+    'nested': nested,
+    'strings': strings,
+    'declarations': declarations,
+    'multiline': multiline,
+}
+
+
+def generate(name: str, size: int, seed: int = 0):
+    return corpora[name](size, random.Random(seed))
@@ -0,0 +1,103 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import errors
+import lexer
+from benchmarks import corpora
+from tokens import GroupToken
+
+
+def count_tokens(tokens: list):
+    count = len(tokens)
+    for token in tokens:
+        if isinstance(token, GroupToken):
+            count += count_tokens(token.children)
+    return count
+
+
+def lex(text: str):
+    error_stream = errors.ErrorStream()
+    tokens = lexer.Lexer('<bench>', text, error_stream).start()
+
+    if error_stream.is_error:
+        raise ValueError('Benchmark corpus does not lex:\n' + error_stream.as_string())
+
+    return tokens
+
+
+def bench_corpus(name: str, size: int, repeat: int, seed: int):
+    text = corpora.generate(name, size, seed)
+
+    # Best of the timed runs, allocations and memory are measured in separate runs
+    seconds = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        tokens = lex(text)
+        seconds = min(seconds, time.perf_counter() - start)
+    token_count = count_tokens(tokens)
+    del tokens
+
+    # Blocks retained after lexing, which is the token list and everything it holds. Blocks allocated and freed
+    # while lexing are not counted
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tokens = lex(text)
+    retained_blocks = sys.getallocatedblocks() - blocks
+    del tokens
+
+    gc.collect()
+    tracemalloc.start()
+    tokens = lex(text)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tokens
+
+    return {
+        'corpus': name,
+        'bytes': len(text.encode()),
+        'chars': len(text),
+        'tokens': token_count,
+        'seconds': seconds,
+        'tokens_per_sec': token_count / seconds,
+        'bytes_per_sec': len(text.encode()) / seconds,
+        'retained_blocks': retained_blocks,
+        'retained_blocks_per_token': retained_blocks / token_count,
+        'retained_memory': current,
+        'peak_memory': peak,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the throughput of the Well lexer on generated programs')
+    parser.add_argument('--corpus', action='append', choices=sorted(corpora.corpora),
+                        help='corpus to run, can be given more than once (default: all)')
+    parser.add_argument('--size', type=int, default=1 << 20, help='size of each corpus in characters')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per corpus, the best one is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'size': args.size,
+        'seed': args.seed,
+        'results': [bench_corpus(name, args.size, args.repeat, args.seed) for name in args.corpus or corpora.corpora],
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+from decimal import Decimal
+
+import errors
+import lexer
+from base_types import *
+from benchmarks import corpora
+from benchmarks.lexer_bench import count_tokens
+
+# Payload of each value kind, made before the values so only the values themselves are measured
+payloads = {
+    'decimal_number': lambda i: Decimal(i) / 4,
+    'int_number': lambda i: i << 10,
+    'string': lambda i: f's{i}',
+}
+value_types = {
+    'decimal_number': Number,
+    'int_number': Number,
+    'string': String,
+}
+
+# Most bytes per value and per token that --check accepts, a bit above what the slot based classes take
+limits = {
+    'bytes_per_value': 56,
+    'bytes_per_token': 200,
+    'bytes_per_buffered_token': 24,
+}
+
+
+def bench_values(kind: str, count: int):
+    items = [payloads[kind](i) for i in range(count)]
+    value_type = value_types[kind]
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    values = [value_type(item) for item in items]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained_blocks = sys.getallocatedblocks() - blocks
+
+    # The list that holds the values is not part of their size
+    list_size = sys.getsizeof(values)
+    del values
+
+    return {
+        'kind': kind,
+        'values': count,
+        'retained_memory': current - list_size,
+        'bytes_per_value': (current - list_size) / count,
+        'blocks_per_value': (retained_blocks - 1) / count,
+        'peak_memory': peak,
+    }
+
+
+def bench_tokens(corpus: str, size: int):
+    text = corpora.generate(corpus, size, 0)
+
+    gc.collect()
+    tracemalloc.start()
+    tokens = lexer.Lexer('<bench>', text, errors.ErrorStream()).start()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    token_count = count_tokens(tokens)
+    del tokens
+
+    return {
+        'kind': 'tokens',
+        'corpus': corpus,
+        'tokens': token_count,
+        'retained_memory': current,
+        'bytes_per_token': current / token_count,
+        'peak_memory': peak,
+    }
+
+
+def bench_token_buffer(corpus: str, size: int):
+    text = corpora.generate(corpus, size, 0)
+
+    gc.collect()
+    tracemalloc.start()
+    buffer = lexer.Lexer('<bench>', text, errors.ErrorStream()).buffer()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    token_count = len(buffer)
+    del buffer
+
+    return {
+        'kind': 'token_buffer',
+        'corpus': corpus,
+        'tokens': token_count,
+        'retained_memory': current,
+        'bytes_per_buffered_token': current / token_count,
+        'peak_memory': peak,
+    }
+
+
+def check(results: list) -> list:  # Results over the limits, as messages
+    failed = []
+    for result in results:
+        for name, limit in limits.items():
+            if name in result and result[name] > limit:
+                failed.append(f'{result["kind"]}: {name} is {result[name]:.1f}, the limit is {limit}')
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the memory of live Well values, tokens and token buffers')
+    parser.add_argument('--kind', action='append', choices=sorted(payloads),
+                        help='value kind to measure, can be given more than once (default: all)')
+    parser.add_argument('--count', type=int, default=1000000, help='number of live values of each kind')
+    parser.add_argument('--corpus', default='declarations', choices=sorted(corpora.corpora),
+                        help='corpus whose tokens are measured')
+    parser.add_argument('--size', type=int, default=1 << 20, help='size of the corpus in characters')
+    parser.add_argument('--check', action='store_true', help='exit with an error when a result is over its limit')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'results': [bench_values(kind, args.count) for kind in args.kind or payloads] +
+                   [bench_tokens(args.corpus, args.size), bench_token_buffer(args.corpus, args.size)],
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    failed = check(report['results']) if args.check else []
+    if failed:
+        sys.exit('Memory limits exceeded:\n' + '\n'.join(failed))
+
+
+if __name__ == '__main__':
+    main()
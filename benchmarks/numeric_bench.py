@@ -0,0 +1,90 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import base_types
+import errors
+import lexer
+import numeric
+import vm
+
+modes = {
+    'decimal': numeric.decimal_mode,
+    'int_float': numeric.int_float_mode,
+    'int_decimal': numeric.int_decimal_mode,
+}
+
+# Statements run over and over by the benchmark, counters and indices are integers, the others have fractions
+workloads = {
+    'integer': 'i = i + 1\ntotal = total + i * 3 % 7\nidx = (i - 1) % 16 + total / 2 * 4 - 8 ^ 2',
+    'fraction': 'i = i + 1\ntotal = total + i * 0.25\nmean = total / i - 1.5 ^ 2',
+}
+setup = 'i = 0\ntotal = 0'
+
+
+def bench_mode(workload: str, mode_name: str, repeat: int, number: int):
+    mode = modes[mode_name]
+    error_stream = errors.ErrorStream()
+    namespace = base_types.Namespace(numbers=mode)
+
+    with mode.use():
+        for tokens in lexer.Lexer('<bench>', setup, error_stream).statements():
+            lexer.parse_tokens(tokens, error_stream, namespace)
+        codes = [lexer.compile_tokens(tokens, error_stream, keep_results=False)
+                 for tokens in lexer.Lexer('<bench>', workloads[workload], error_stream).statements()]
+        if error_stream.is_error:
+            raise ValueError('Benchmark workload does not compile:\n' + error_stream.as_string())
+
+        # Best of the timed runs, each one runs every statement number times
+        seconds = float('inf')
+        machine = vm.VM(error_stream, namespace)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                for code in codes:
+                    machine.run(code)
+            seconds = min(seconds, time.perf_counter() - start)
+
+    if error_stream.is_error:
+        raise ValueError('Benchmark workload failed:\n' + error_stream.as_string())
+
+    return {
+        'workload': workload,
+        'mode': mode_name,
+        'seconds': seconds,
+        'statements_per_sec': number * len(codes) / seconds,
+        'total': str(namespace.search_var_by_name('total').value.value),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the number modes of Well on arithmetic workloads')
+    parser.add_argument('--workload', action='append', choices=sorted(workloads),
+                        help='workload to run, can be given more than once (default: all)')
+    parser.add_argument('--mode', action='append', choices=sorted(modes),
+                        help='number mode to run, can be given more than once (default: all)')
+    parser.add_argument('--number', type=int, default=2000, help='runs of the workload per timed run')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is reported')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'number': args.number,
+        'results': [bench_mode(workload, mode, args.repeat, args.number)
+                    for workload in args.workload or workloads for mode in args.mode or modes],
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import json
+import platform
+import sys
+import timeit
+from decimal import Decimal
+
+from base_types import *
+from tokens import WordKinds
+
+# The dispatch the table replaced, kept as the baseline: a method per operator on the left value, found with
+# getattr, that checks the type of the other value with isinstance. Pairs that are not supported return None
+legacy_binary = {
+    WordKinds.plus: 'operator_add', WordKinds.minus: 'operator_sub', WordKinds.star: 'operator_mul',
+    WordKinds.bigger: 'operator_bigger', WordKinds.is_op: 'operator_equal', WordKinds.and_op: 'operator_and',
+}
+legacy_unary = {WordKinds.minus: 'operator_unary_minus', WordKinds.not_op: 'operator_unary_not'}
+
+
+class LegacyNumber(Number):
+    __slots__ = ()
+
+    def operator_add(self, other):
+        if isinstance(other, Number):
+            return to_number(self.value + other.value)
+        else:
+            return None
+
+    def operator_sub(self, other):
+        if isinstance(other, Number):
+            return to_number(self.value - other.value)
+        else:
+            return None
+
+    def operator_mul(self, other):
+        if isinstance(other, Number):
+            return to_number(self.value * other.value)
+        elif isinstance(other, String):
+            return String(int(self.value) * other.value)
+        else:
+            return None
+
+    def operator_bigger(self, other):
+        if isinstance(other, Number):
+            return to_bool(self.value > other.value)
+        else:
+            return None
+
+    def operator_equal(self, other):
+        if isinstance(other, Number):
+            return to_bool(self.value == other.value)
+        else:
+            return shared_false
+
+    def operator_and(self, other):
+        if isinstance(other, Any):
+            return to_bool(bool(self.value) and bool(other.value))
+        else:
+            return None
+
+    def operator_unary_minus(self):
+        return to_number(-self.value)
+
+    def operator_unary_not(self):
+        return to_bool(not self.value)
+
+
+class LegacyString(String):
+    __slots__ = ()
+
+    def operator_add(self, other):
+        if isinstance(other, String):
+            return String(self.value + other.value)
+        else:
+            return None
+
+    def operator_sub(self, other):
+        return None
+
+    def operator_mul(self, other):
+        return None
+
+    def operator_bigger(self, other):
+        return None
+
+    def operator_equal(self, other):
+        if isinstance(other, String):
+            return to_bool(self.value == other.value)
+        else:
+            return shared_false
+
+    def operator_and(self, other):
+        if isinstance(other, Any):
+            return to_bool(bool(self.value) and bool(other.value))
+        else:
+            return None
+
+
+legacy_types = {Number: LegacyNumber, String: LegacyString}
+
+
+def legacy(value: Any) -> Any:  # The same value as an instance of the baseline class
+    return legacy_types[type(value)](value.value) if type(value) in legacy_types else value
+
+
+# Operations run by the benchmark, (name, left, operator kind, right)
+binary_cases = [
+    ('number + number', Number(Decimal(2)), WordKinds.plus, Number(Decimal(3))),
+    ('number > number', Number(Decimal(2)), WordKinds.bigger, Number(Decimal(3))),
+    ('number * string', Number(Decimal(3)), WordKinds.star, String('ab')),
+    ('number is string', Number(Decimal(2)), WordKinds.is_op, String('ab')),
+    ('string and null', String('ab'), WordKinds.and_op, shared_null),
+    ('string + number', String('ab'), WordKinds.plus, Number(Decimal(2))),
+]
+unary_cases = [
+    ('-number', WordKinds.minus, Number(Decimal(2))),
+    ('not number', WordKinds.not_op, Number(Decimal(2))),
+]
+
+
+def best(func, number: int, repeat: int):  # Nanoseconds per call of the fastest run
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e9
+
+
+def bench_binary(name: str, left: Any, kind: int, right: Any, number: int, repeat: int):
+    # Dispatch as the VM does it, the baseline methods, and the looked up function called directly
+    def dispatch():
+        func = binary_operations.get((type(left), kind, type(right)))
+        return func(left, right) if func else None
+
+    legacy_left = legacy(left)
+    legacy_right = legacy(right)
+    method = legacy_binary[kind]
+
+    def legacy_dispatch():
+        return getattr(legacy_left, method)(legacy_right)
+
+    func = binary_operations.get((type(left), kind, type(right)))
+    return {
+        'operation': name,
+        'supported': func is not None,
+        'legacy_ns': best(legacy_dispatch, number, repeat),
+        'dispatch_ns': best(dispatch, number, repeat),
+        'direct_ns': best(lambda: func(left, right), number, repeat) if func else None,
+    }
+
+
+def bench_unary(name: str, kind: int, value: Any, number: int, repeat: int):
+    def dispatch():
+        func = unary_operations.get((type(value), kind))
+        return func(value) if func else None
+
+    legacy_value = legacy(value)
+    method = legacy_unary[kind]
+
+    def legacy_dispatch():
+        return getattr(legacy_value, method)()
+
+    func = unary_operations.get((type(value), kind))
+    return {
+        'operation': name,
+        'supported': func is not None,
+        'legacy_ns': best(legacy_dispatch, number, repeat),
+        'dispatch_ns': best(dispatch, number, repeat),
+        'direct_ns': best(lambda: func(value), number, repeat) if func else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the cost of applying operators to Well values')
+    parser.add_argument('--number', type=int, default=200000, help='calls per timed run')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per operation, the best one is reported')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'number': args.number,
+        'results': [bench_binary(*case, args.number, args.repeat) for case in binary_cases] +
+                   [bench_unary(*case, args.number, args.repeat) for case in unary_cases],
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
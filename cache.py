@@ -0,0 +1,154 @@
+import hashlib
+import io
+import marshal
+import os
+import sys
+import tempfile
+from array import array
+
+from errors import ErrorStream
+from lexer import StreamLexer
+from tokens import *
+
+# Bump when the lexer or the token classes change, so old cache files are lexed again
+version = 3
+
+magic = b'WELC'
+key_size = hashlib.sha256().digest_size
+cache_dir_name = '__wellcache__'
+
+chunk_size = 1 << 16
+
+
+class KeyReader:  # Reads a text stream for the lexer and hashes everything that was read, for the cache key
+    def __init__(self, stream):
+        self.stream = stream
+        self.hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> str:
+        chunk = self.stream.read(size)
+        self.hash.update(chunk.encode())
+        return chunk
+
+    def key(self) -> bytes:  # Cache files are valid for one source text, lexer version and python build
+        key = self.hash.copy()
+        key.update(f'{version}:{sys.version_info[0]}.{sys.version_info[1]}:{marshal.version}:{sys.byteorder}'.encode())
+        return key.digest()
+
+
+def source_key(path: str) -> bytes:  # Key of a source file, it is read in chunks and not kept in memory
+    with open(path, 'r') as f:
+        reader = KeyReader(f)
+        while reader.read(chunk_size):
+            pass
+    return reader.key()
+
+
+def cache_path(path: str, cache_dir: str = None) -> str:
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(cache_dir if cache_dir else os.path.join(directory, cache_dir_name), name + '.wellc')
+
+
+def cached_key(path: str):  # Key at the start of a cache file, None when there is no cache file
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(len(magic) + key_size)
+    except OSError:
+        return None
+
+    if len(header) != len(magic) + key_size or not header.startswith(magic):
+        return None
+    return header[len(magic):]
+
+
+def load(path: str, key: bytes):  # The encoded statements of the cache file, None when it is missing or stale
+    header = magic + key
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(header)) != header:
+                return None
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):  # Damaged file, lexed again and overwritten
+        return None
+
+
+def decode(data, source: SourceMap):
+    # The statements of the encoded data, decoded one at a time while they are read. None when the arrays do
+    # not fit together, so decoding never stops in the middle of the file
+    try:
+        lengths, codes, positions, counts = (array(code, items) for code, items in zip('IBII', data))
+    except (ValueError, TypeError):
+        return None
+
+    groups = sum(codes.count(code) for code in range(first_group_code, len(token_classes)))
+    if len(positions) != 2 * len(codes) or len(counts) != groups or sum(lengths) + sum(counts) != len(codes):
+        return None
+    if codes and max(codes) >= len(token_classes) or positions and max(positions) > len(source.text):
+        return None
+
+    return decode_tokens(lengths, codes, positions, counts, source)
+
+
+def dump(path: str, key: bytes, lengths, codes, positions, counts):
+    # Written to a temporary file first, so a crash or a parallel run never leaves half of a cache file
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=os.path.dirname(path))
+    except OSError:  # The directory is not writable, run without a cache
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(magic + key)
+            # marshal writes the arrays as their bytes without copying them first
+            marshal.dump((lengths, codes, positions, counts), f)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def statements(path: str, error_stream: ErrorStream, cache_dir: str = None):
+    # Yields the token lists of the top-level statements of a file, from its cache file when the source
+    # did not change. Otherwise the file is streamed like lexer.execute_stream does it, each statement is
+    # yielded as soon as it is lexed and the cache file is written once the whole file was read.
+    # A lexing error is added to error_stream after the statements before it, like when streaming
+    # A cache hit keeps the text and the arrays of the file in memory, a few bytes per token, and makes the token
+    # objects of one statement at a time
+    cache_file = cache_path(path, cache_dir)
+
+    if cached_key(cache_file) is None:
+        with open(path, 'r') as f:
+            yield from lex_statements(path, KeyReader(f), cache_file, error_stream)
+        return
+
+    # The statements are decoded from the same text the key was made from, in case the file changes meanwhile
+    with open(path, 'r') as f:
+        reader = KeyReader(f)
+        text = reader.read()
+
+    data = load(cache_file, reader.key())
+    cached = None if data is None else decode(data, SourceMap(path, text))
+    if cached is not None:
+        yield from cached
+    else:
+        yield from lex_statements(path, KeyReader(io.StringIO(text)), cache_file, error_stream)
+
+
+def lex_statements(path: str, reader: KeyReader, cache_file: str, error_stream: ErrorStream):
+    # Yields the statements of the reader while they are lexed, then writes them to the cache file
+    lex_errors = ErrorStream()
+    lengths, codes, positions, counts = array('I'), array('B'), array('I'), array('I')
+
+    for tokens in StreamLexer(path, reader, lex_errors, chunk_size).statements():
+        lengths.append(len(tokens))
+        encode_tokens(tokens, codes, positions, counts)
+        yield tokens
+
+    if not lex_errors.is_error:
+        # The key is made from the text that was lexed, in case the file changed since it was checked
+        dump(cache_file, reader.key(), lengths, codes, positions, counts)
+
+    error_stream.add_errors(lex_errors)
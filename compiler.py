@@ -0,0 +1,154 @@
+from base_types import *
+from nodes import *
+
+
+class OpCodes:
+    load_const = 0  # Push constants[arg]
+    load_name = 1  # Push the value of the variable or constant in the name slot arg, names[arg] is its name
+    build_array = 2  # Pop arg values and push an array of them
+    call = 3  # Call the function names[arg], push null
+    get_property = 4  # Replace the value on top with its property names[arg]
+    unary_op = 5  # Apply the unary operator of kind arg to the value on top
+    binary_op = 6  # Pop the right and the left value, push the result of the operator of kind arg
+    store_name = 7  # Assign the value on top to the variable names[arg], the value stays on the stack
+    store_const = 8  # Declare the value on top as the constant names[arg]
+    store_ref = 9  # Assign the value on top to the variable that the reference names[arg] refers to
+    store_temp = 10  # Keep the value on top in the temporary slot arg, the value stays on the stack
+    load_temp = 11  # Push the value kept in the temporary slot arg, at the positions of the ReuseNode
+
+    names = {
+        load_const: 'load_const', load_name: 'load_name', build_array: 'build_array', call: 'call',
+        get_property: 'get_property', unary_op: 'unary_op', binary_op: 'binary_op',
+        store_name: 'store_name', store_const: 'store_const', store_ref: 'store_ref',
+        store_temp: 'store_temp', load_temp: 'load_temp',
+    }
+
+
+class Code:  # Compiled statement, the values left on the stack after running it are its result
+    def __init__(self):
+        self.instructions = []  # (opcode, arg)
+        self.nodes = []  # The node of each instruction, for the positions of errors
+        self.constants = []
+        self.names = []  # Name of each slot, a name used more than once in the code has a single slot
+        self.temps = 0  # Number of temporary slots
+
+        self.__name_idx = {}
+
+    def __repr__(self):
+        return '\n'.join(f'{OpCodes.names[op]} {arg}' for op, arg in self.instructions)
+
+    def add(self, op: int, arg: int, node: Node):
+        self.instructions.append((op, arg))
+        self.nodes.append(node)
+
+    def add_constant(self, value) -> int:
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def add_name(self, name: str) -> int:
+        idx = self.__name_idx.get(name)
+        if idx is None:
+            idx = self.__name_idx[name] = len(self.names)
+            self.names.append(name)
+
+        return idx
+
+
+class Compiler:  # Compiles the nodes made by lexer.Parser to the instructions run by vm.VM
+    def __init__(self):
+        self.code = Code()
+
+        # The method that compiles each node class
+        self.methods = {
+            NumberNode: self.compile_number,
+            StringNode: self.compile_string,
+            BoolNode: self.compile_bool,
+            NullNode: self.compile_null,
+            ReferenceNode: self.compile_reference,
+            ArrayNode: self.compile_array,
+            NameNode: self.compile_name,
+            CallNode: self.compile_call,
+            PropertyNode: self.compile_property,
+            UnaryOpNode: self.compile_unary_op,
+            BinaryOpNode: self.compile_binary_op,
+            AssignNode: self.compile_assign,
+            ConstNode: self.compile_const,
+            ReferenceAssignNode: self.compile_reference_assign,
+            SaveNode: self.compile_save,
+            ReuseNode: self.compile_reuse,
+        }
+
+    def start(self, nodes: list) -> Code:
+        for node in nodes:
+            self.compile(node)
+
+        return self.code
+
+    def compile(self, node: Node):
+        self.methods[type(node)](node)
+
+    # Values of literals never change, so they are made once and loaded as constants
+    def load_constant(self, value, node: Node):
+        self.code.add(OpCodes.load_const, self.code.add_constant(value), node)
+
+    def compile_number(self, node: NumberNode):
+        self.load_constant(to_number(node.value), node)
+
+    def compile_string(self, node: StringNode):
+        self.load_constant(String(node.value), node)
+
+    def compile_bool(self, node: BoolNode):
+        self.load_constant(to_bool(node.value), node)
+
+    def compile_null(self, node: NullNode):
+        self.load_constant(shared_null, node)
+
+    def compile_reference(self, node: ReferenceNode):
+        self.load_constant(ReferenceType(node.name), node)
+
+    def compile_array(self, node: ArrayNode):
+        for element in node.elements:
+            self.compile(element)
+        self.code.add(OpCodes.build_array, len(node.elements), node)
+
+    def compile_name(self, node: NameNode):
+        self.code.add(OpCodes.load_name, self.code.add_name(node.name), node)
+
+    def compile_call(self, node: CallNode):
+        self.code.add(OpCodes.call, self.code.add_name(node.name), node)
+
+    def compile_property(self, node: PropertyNode):
+        self.compile(node.value)
+        self.code.add(OpCodes.get_property, self.code.add_name(node.name), node)
+
+    def compile_unary_op(self, node: UnaryOpNode):
+        self.compile(node.operand)
+        self.code.add(OpCodes.unary_op, node.operator, node)
+
+    def compile_binary_op(self, node: BinaryOpNode):
+        self.compile(node.left)
+        self.compile(node.right)
+        self.code.add(OpCodes.binary_op, node.operator, node)
+
+    def compile_assign(self, node: AssignNode):
+        self.compile(node.value)
+        self.code.add(OpCodes.store_name, self.code.add_name(node.name.name), node)
+
+    def compile_const(self, node: ConstNode):
+        if node.value:
+            self.compile(node.value)
+        else:
+            self.load_constant(shared_null, node)
+        self.code.add(OpCodes.store_const, self.code.add_name(node.name.name), node)
+
+    def compile_reference_assign(self, node: ReferenceAssignNode):
+        self.compile(node.value)
+        self.code.add(OpCodes.store_ref, self.code.add_name(node.reference.name), node)
+
+    def compile_save(self, node: SaveNode):
+        self.compile(node.value)
+        self.code.add(OpCodes.store_temp, node.slot, node)
+        self.code.temps = max(self.code.temps, node.slot + 1)
+
+    def compile_reuse(self, node: ReuseNode):
+        self.code.add(OpCodes.load_temp, node.slot, node)
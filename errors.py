@@ -23,19 +23,22 @@ class Error:
         SyntaxError: Expected closing quote ""
         '''
 
+        source = self.start.source
+        line, column = source.line_col(self.start.idx)
+
         # Add the file and context
         msg: str = (f'File: {col.Fore.YELLOW}{self.start.loc}{col.Style.RESET_ALL}' +
                     (f', {col.Fore.MAGENTA}{self.context}{col.Style.RESET_ALL}\n' if self.context else '\n'))
 
         # Add the position information
-        msg += f'\tline: {col.Fore.BLUE}{self.start.line}{col.Style.RESET_ALL}'
-        msg += f', column: {col.Fore.BLUE}{self.start.col}{col.Style.RESET_ALL}'
+        msg += f'\tline: {col.Fore.BLUE}{line}{col.Style.RESET_ALL}'
+        msg += f', column: {col.Fore.BLUE}{column}{col.Style.RESET_ALL}'
         msg += f', index: {col.Fore.BLUE}{self.start.idx}{col.Style.RESET_ALL} to {col.Fore.BLUE}{self.end.idx}{col.Style.RESET_ALL}\n'
 
         # Add the error line and the underlined error, and help message if it isn't None
-        msg += self.start.get_line_text() + '\n'
+        msg += source.line_text(line) + '\n'
 
-        msg += ' ' * (self.start.col - 1)
+        msg += ' ' * (column - 1)
         msg += col.Fore.RED + '~' * (self.end.idx - self.start.idx) + col.Style.RESET_ALL
         msg += col.Fore.MAGENTA + ' ' + self.help + '\n' + col.Style.RESET_ALL if self.help else '\n'
 
@@ -75,6 +78,9 @@ class ErrorStream:
     def add_error(self, error: Error):
         self.__stream.append(error)
 
+    def add_errors(self, error_stream: 'ErrorStream'):
+        self.__stream.extend(error_stream.__stream)
+
     def as_string(self):
         result = '\n\n'.join([i.as_string() for i in self.__stream])
 
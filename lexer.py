@@ -1,599 +1,671 @@
+import bisect
+import re
+
 import base_types
+import compiler
+import numeric
+import optimizer
+import vm
 from base_types import *
 from errors import *
+from nodes import *
 from tokens import *
 
 
+def build_scanner(close_char: str = None):
+    # One compiled pattern per group kind, the closing char of the group we are in ends the words.
+    # Whitespace before a lexeme is skipped by the same match, the end of the text matches as eof
+    stop_chars = re.escape(Triggers.whitespace + ''.join(Triggers.special_chars) + Triggers.string_chars +
+                           Triggers.open_chars + (close_char or ''))
+    return re.compile(
+        f'[{re.escape(Triggers.whitespace)}]*(?:'
+        f'(?P<word>[^{stop_chars}{string.digits}][^{stop_chars}]*)'
+        f'|(?P<special>[{re.escape("".join(Triggers.special_chars))}])'
+        f'|(?P<number>[{string.digits}][{re.escape(Triggers.dot_digits)}_]*)'
+        f'|(?P<string>[{re.escape(Triggers.string_chars)}])'
+        f'|(?P<open>[{re.escape(Triggers.open_chars)}])'
+        + (f'|(?P<close>{re.escape(close_char)})' if close_char else '') +
+        r'|(?P<eof>\Z))'
+    )
+
+
+scanners = {close_char: build_scanner(close_char) for close_char in [None] + list(Triggers.close_chars)}
+
+# Bodies of the "", '' and `` strings, an escaped closing char does not end the string
+string_bodies = {char: re.compile(rf'(?:[^\\{char}]+|\\.)*', re.DOTALL) for char in Triggers.string_chars}
+
+
 class Lexer:
-    def __init__(self, filename, text, error_stream: ErrorStream = None):
+    def __init__(self, filename, text, error_stream: ErrorStream = None, source: SourceMap = None):
         self.filename = filename
         self.text = text
-
-        self.pos = Position(filename, text)
-        self.start_pos = self.pos.copy()
+        self.source = source if source else SourceMap(filename, text)
 
         self.error_stream = error_stream if error_stream else ErrorStream()
 
         self.tokens = []
-        self.tok = ''
+
+        # When more text may follow this one, a lexeme that reaches the end of the text is not complete
+        self.more = False
+        # Where the lexed statement ends, see lex
+        self.end = 0
 
     def start(self) -> list:
-        is_comment = False
-        while self.pos.char is not None:
-            self.tok += self.pos.char
-            if self.pos.char in ' \r\t\n':
-                self.check_for_word()
-                self.pos.advance()
-                self.set_start_pos()
-                continue
+        self.lex()
 
-            # Append some special characters like =, : immediately
-            elif self.pos.char in Triggers.special_chars:
-                self.check_for_word()
-                self.set_start_pos()
-                self.generate_special_char()
-                self.set_start_pos()
-
-            # Generate a number token
-            elif self.pos.char in string.digits and len(self.tok) == 1:
-                self.set_start_pos()
-                self.generate_number()
-                self.set_start_pos()
-                continue  # Continue because while parsing the number the pointer is already on the next character
-
-            # Generate the string token
-            elif self.pos.char in ['"', "'"]:
-                self.set_start_pos()
-                self.generate_string()
-                self.set_start_pos()
-
-            # Generate multi-line string token (newlines allowed)
-            elif self.pos.char == '`':
-                self.set_start_pos()
-                self.generate_multiline_string()
-                self.set_start_pos()
-
-            elif self.pos.char == Triggers.paren_expr[0]:  # () expression
-                self.check_for_word()
-                self.set_start_pos()
-                self.add_paren_expr()
-                self.set_start_pos()
-
-            elif self.pos.char == Triggers.bracket_expr[0]:  # [] expression
-                self.check_for_word()
-                self.set_start_pos()
-                self.add_bracket_expr()
-                self.set_start_pos()
-
-            elif self.pos.char == Triggers.brace_expr[0]:  # {} expression
-                self.set_start_pos()
-                self.add_brace_expr()
-                self.set_start_pos()
-
-            elif self.pos.char == Triggers.angle_expr[0]:  # <> expression
-                self.check_for_word()
-                self.set_start_pos()
-                self.add_angle_expr()
-                self.set_start_pos()
+        return self.tokens
 
-            if self.error_stream.is_error:
-                break
+    def lex(self, end: int = 0, statement: bool = False, stop_at=None) -> bool:
+        # Lexes from end, in statement mode stops at the first newline outside of any group.
+        # stop_at(idx) can stop the lexer before any top-level lexeme, self.end is then idx.
+        # Returns False when the text ended before the statement did and more text is needed
+        text = self.text
+        source = self.source
+        tokens = self.tokens
+        groups = []  # Open groups we are inside, as (outer tokens, token class, open_close, start idx)
 
-            self.pos.advance()
+        scanner = scanners[None]
 
-        self.check_for_word(eof=True)
+        while True:
+            match = scanner.match(text, end)
+            kind = match.lastgroup
+            idx = match.start(kind)
 
-        return self.tokens
+            if statement and idx != end and not groups and self.tokens:
+                newline = text.find('\n', end, idx)
+                if newline != -1:
+                    self.end = newline + 1
+                    return True
 
-    def set_start_pos(self):  # Set self.start_pos to current position:
-        self.tok = ''
-        self.start_pos = self.pos.copy()
+            if stop_at is not None and not groups and stop_at(idx):
+                self.end = idx
+                return True
 
-    def check_for_word(self, eof: bool = False):
-        token_before: str = self.get_sliced_token() if not eof else self.tok
+            end = match.end()
+            if end >= len(text) and self.more:
+                return False
 
-        if token_before != '':
-            self.tokens.append(WordToken(token_before, self.start_pos, self.pos))
+            if kind == 'word':
+                tokens.append(WordToken(match.group(kind), source, idx, end))
 
-    def get_sliced_token(self, n: int = 1):
-        return self.tok[:-n]
+            # Append some special characters like =, : immediately
+            elif kind == 'special':
+                tokens.append(WordToken(match.group(kind), source, idx, end))
+
+            elif kind == 'number':
+                token = self.generate_number(match.group(kind), idx, end)
+                if token is None:
+                    break
+                tokens.append(token)
+
+            # Generate the string token, multi-line strings allow newlines
+            elif kind == 'string':
+                body = string_bodies[match.group(kind)].match(text, end)
+                # A backslash that is the last char read can not match as an escape yet, the body stops before it
+                if self.more and (body.end() >= len(text) or body.end() == len(text) - 1 and text[-1] == '\\'):
+                    return False
+
+                if match.group(kind) == '`':
+                    token, end = self.generate_multiline_string(idx, body)
+                else:
+                    token, end = self.generate_string(idx, body)
+
+                if token is None:
+                    break
+                tokens.append(token)
+
+            elif kind == 'open':  # (), [], {} or <> expression, its tokens are collected into their own list
+                cls, open_close = Triggers.groups[match.group(kind)]
+                groups.append((tokens, cls, open_close, idx))
+                tokens = []
+                scanner = scanners[open_close[1]]
+
+            elif kind == 'close':
+                outer_tokens, cls, open_close, start = groups.pop()
+                outer_tokens.append(cls(tokens, source, start, end))
+                tokens = outer_tokens
+                scanner = scanners[groups[-1][2][1] if groups else None]
+
+            else:  # End of the text
+                if groups:
+                    self.add_unclosed_group_error(groups)
+                break
 
-    def generate_number(self):
-        # 400'hello'
-        dot_count = 0
-        number = self.pos.char
+        self.end = len(text)
+        return True
+
+    def statements(self) -> list:  # Lexes the whole text into the token lists of its top-level statements
+        statements = []
+        end = 0
+
+        while end < len(self.text):
+            self.tokens = []
+            self.lex(end, statement=True)
+            if self.error_stream.is_error:
+                break
 
-        self.pos.advance()
+            if self.tokens:
+                statements.append(self.tokens)
+            end = self.end
 
-        while self.pos.char is not None and self.pos.char in Triggers.dot_digits + '_':
-            if self.pos.char == '.':
-                dot_count += 1
+        return statements
 
-            if self.pos.char != '_':
-                number += self.pos.char
+    def buffer(self) -> TokenBuffer:
+        # Lexes the whole text into a token buffer, only the tokens of one statement are objects at a time
+        buffer = TokenBuffer(self.source)
+        end = 0
 
-            self.pos.advance()
+        while end < len(self.text):
+            self.tokens = []
+            self.lex(end, statement=True)
+            if self.error_stream.is_error:
+                break
 
+            if self.tokens:
+                buffer.add_statement(self.tokens)
+            end = self.end
+
+        self.tokens = []
+        return buffer
+
+    def position(self, idx: int) -> Position:
+        return Position(self.source, self.source.offset + idx)
+
+    def generate_number(self, number: str, start: int, end: int):
+        # 400'hello'
+        if '_' in number:
+            number = number.replace('_', '')
+
+        dot_count = number.count('.')
         if dot_count > 1:
             self.error_stream.add_error(SyntaxErrorException(
                 f'Got too much dots in number ({dot_count})',
-                self.start_pos, self.pos, 'while parsing number',
+                self.position(start), self.position(end), 'while parsing number',
                 'Replace to ' + (number[::-1].replace('.', '', number.count('.') - 1))[::-1]
             ))
-            return
-
-        if number.endswith('.'):
-            number = number[:-1]
-
-        self.tokens.append(NumberToken(number, self.start_pos, self.pos))
+            return None
 
-    def generate_string(self):
-        close_char: str = self.pos.char
-        escape: bool = False
-        string = ''
+        return NumberToken(number_value(number), self.source, start, end)
 
-        self.pos.advance()
+    def generate_string(self, start: int, match):
+        close_char: str = self.text[start]
+        end = match.end()
+        string = match.group()
 
-        while self.pos.char is not None:
-            if self.pos.char == close_char and not escape:
-                break
+        # Every newline inside the string is reported, then the string is checked to be closed
+        newline = string.find('\n')
+        while newline != -1:
+            before: str = string_value(string[:newline], close_char).replace('\n', '')
+            self.error_stream.add_error(SyntaxErrorException(
+                'Newline not allowed in a single-line string, use multi-line string instead',
+                self.position(start), self.position(start + 1 + newline),
+                'while parsing string',
+                '`' + before + col.Style.RESET_ALL + ' ...'
+            ))
+            newline = string.find('\n', newline + 1)
 
-            elif self.pos.char == '\n':
-                self.error_stream.add_error(SyntaxErrorException(
-                    'Newline not allowed in a single-line string, use multi-line string instead',
-                    self.start_pos, self.pos,
-                    'while parsing string',
-                    '`' + string + col.Style.RESET_ALL + ' ...'
-                ))
+        if end >= len(self.text) or self.text[end] != close_char:
+            end = len(self.text)
+            self.error_stream.add_error(SyntaxErrorException(
+                'String was never closed',
+                self.position(start), self.position(end),
+                'while parsing string',
+                close_char
+            ))
+            return None, end
 
-            elif self.pos.char == '\\':
-                escape = True
-
-            elif escape and self.pos.char != close_char:
-                # TODO: add match expr here after new python version
-
-                if self.pos.char == 'n':
-                    string += '\n'
-                elif self.pos.char == 't':
-                    string += '\t'
-                elif self.pos.char == 'b':
-                    string += '\b'
-                elif self.pos.char == 'f':
-                    string += '\f'
-                elif self.pos.char == 'r':
-                    string += '\r'
-                elif self.pos.char == '\\':
-                    string += '\\'
-                else:
-                    string += '\\' + self.pos.char
+        if '\n' in string:
+            return None, end + 1
 
-                escape = False
+        return StringToken(string_value(string, close_char), self.source, start, end + 1), end + 1
 
-            elif escape and self.pos.char == close_char:
-                string += close_char
+    def generate_multiline_string(self, start: int, match):
+        close_char = self.text[start]
+        end = match.end()
 
-            else:
-                string += self.pos.char
-
-            self.pos.advance()
-        else:
+        if end >= len(self.text) or self.text[end] != close_char:
+            end = len(self.text)
             self.error_stream.add_error(SyntaxErrorException(
                 'String was never closed',
-                self.start_pos, self.pos,
+                self.position(start), self.position(end),
                 'while parsing string',
                 close_char
             ))
-            return
+            return None, end
 
-        self.tokens.append(StringToken(string, self.start_pos, self.pos))
+        return StringToken(string_value(match.group(), close_char), self.source, start, end + 1), end + 1
 
-    def generate_multiline_string(self):
-        close_char = '`'
-        close_char = self.pos.char
-        escape = False
-        string = ''
+    def add_unclosed_group_error(self, groups: list):
+        _, _, (open_char, close_char), start = groups[0]
+        block_depth: int = sum(1 for group in groups if group[2][1] == close_char)
 
-        self.pos.advance()
+        self.error_stream.add_error(SyntaxErrorException(
+            f'Expected {block_depth} more {close_char}-s, expression not fully closed',
+            self.position(start), self.position(len(self.text)),
+            f'while inside {open_char}{close_char} expression (depth: {block_depth})',
+            close_char * block_depth
+        ))
 
-        while self.pos.char is not None:
-            if self.pos.char == close_char and not escape:
-                break
 
-            elif self.pos.char == '\\':
-                escape = True
+class IncrementalLexer:  # Keeps the tokens of a text that is being edited, only the edited part is lexed again
+    def __init__(self, filename, text):
+        self.filename = filename
+        self.source = SourceMap(filename, text)
 
-            elif escape:
-                if self.pos.char == close_char:
-                    string += close_char
-                else:
-                    string += '\\' + self.pos.char
-                escape = False
+        # Errors of the current text, a new stream is used for every edit
+        self.error_stream = ErrorStream()
 
-            else:
-                string += self.pos.char
+        self.tokens = Lexer(filename, text, self.error_stream, self.source).start()
+        self.complete = not self.error_stream.is_error
 
-            self.pos.advance()
-        else:
-            self.error_stream.add_error(SyntaxErrorException(
-                'String was never closed',
-                self.start_pos, self.pos,
-                'while parsing string',
-                close_char
-            ))
-            return
+    def edit(self, offset: int, deleted: int, inserted: str) -> list:
+        # Replace deleted characters at offset by the inserted text, returns the updated tokens
+        self.source.edit(offset, deleted, inserted)
+        text = self.source.text
+
+        self.error_stream = ErrorStream()
+        lexer = Lexer(self.filename, text, self.error_stream, self.source)
 
-        self.tokens.append(StringToken(string, self.start_pos, self.pos))
+        if not self.complete:  # Tokens after an error were never lexed
+            self.tokens = lexer.start()
+            self.complete = not self.error_stream.is_error
+            return self.tokens
 
-    def generate_special_char(self):
-        self.tokens.append(WordToken(self.pos.char, self.start_pos, self.pos))
+        # A token is lexed from the text up to its end, including the char that ended it. The tokens that
+        # end before the edit stay, lexing starts again at the top level right after them
+        tokens = self.tokens
+        first = bisect.bisect_left(tokens, offset, key=lambda token: token.end_idx)
+        start = tokens[first - 1].end_idx if first else 0
 
-    def get_wrapped_expr(self, open_close):
-        open_char, close_char = open_close
-        result = ''
-        if self.pos.char != open_char:
-            return result
+        # Once a new top-level lexeme starts where an old token after the edit starts, everything
+        # from there on is lexed the same as before, only moved by delta
+        delta = len(inserted) - deleted
+        resync = bisect.bisect_left(tokens, offset + deleted, key=lambda token: token.start_idx)
 
-        self.pos.advance()
+        def stop_at(idx: int):
+            nonlocal resync
+            while resync < len(tokens) and tokens[resync].start_idx + delta < idx:
+                resync += 1
+            return resync < len(tokens) and tokens[resync].start_idx + delta == idx
 
-        block_depth: int = 1
-        is_string: bool = False
-        str_char: str = ''
+        lexer.lex(start, stop_at=stop_at)
 
-        while self.pos.char is not None:
-            if is_string and self.pos.char == str_char:
-                is_string = False
-                str_char = ''
+        if self.error_stream.is_error:
+            self.tokens = tokens[:first] + lexer.tokens
+            self.complete = False
+            return self.tokens
 
-            elif not is_string:
-                if self.pos.char in ['"', "'", '`']:
-                    is_string = True
-                    str_char = self.pos.char
+        rest = tokens[resync:] if lexer.end < len(text) else []
+        shift_tokens(rest, delta)
 
-                elif self.pos.char == close_char:
-                    block_depth -= 1
-                    if block_depth == 0:
-                        break
+        self.tokens = tokens[:first] + lexer.tokens + rest
+        return self.tokens
 
-                elif self.pos.char == open_char:
-                    block_depth += 1
 
-            result += self.pos.char
-            self.pos.advance()
+def shift_tokens(tokens: list, delta: int):
+    for token in tokens:
+        token.start_idx += delta
+        token.end_idx += delta
 
-        if block_depth != 0:
-            self.error_stream.add_error(SyntaxErrorException(
-                f'Expected {block_depth} more {close_char}-s, expression not fully closed',
-                self.start_pos, self.pos,
-                f'while inside {open_char}{close_char} expression (depth: {block_depth})',
-                close_char * block_depth
-            ))
+        if isinstance(token, GroupToken):
+            shift_tokens(token.children, delta)
 
-        return result
 
-    def add_expr_instance(self, cls, open_close):
-        inner: str = self.get_wrapped_expr(open_close)
-        if inner is not None:
-            self.tokens.append(cls(inner, self.start_pos, self.pos))
+class StreamLexer:  # Reads the text from a stream in chunks and yields the top-level statements as they are lexed
+    def __init__(self, filename, stream, error_stream: ErrorStream = None, chunk_size: int = 1 << 16):
+        self.filename = filename
+        self.stream = stream
+        self.chunk_size = chunk_size
+
+        self.error_stream = error_stream if error_stream else ErrorStream()
 
-    def add_paren_expr(self):
-        self.add_expr_instance(ParenExprToken, Triggers.paren_expr)
+        # The text read but not lexed yet, where it starts in the file and on which line
+        self.text = ''
+        self.offset = 0
+        self.line = 1
+        self.eof = False
+
+    def statements(self):
+        # A statement is everything up to a newline outside of any group, only the statement
+        # being lexed and the chunk it was read with are held in memory
+        read_size = self.chunk_size
+        idx = 0
+
+        while True:
+            if not self.eof and len(self.text) - idx < self.chunk_size:
+                self.read(idx, self.chunk_size)
+                idx = 0
+
+            source = SourceMap(self.filename, self.text, self.offset, self.line)
+            lexer = Lexer(self.filename, self.text, self.error_stream, source)
+            lexer.more = not self.eof
+
+            if not lexer.lex(idx, statement=True):
+                # The statement goes on in the text that was not read yet, read more each time it happens
+                self.read(idx, read_size)
+                read_size *= 2
+                idx = 0
+                continue
 
-    def add_bracket_expr(self):
-        self.add_expr_instance(BracketExprToken, Triggers.bracket_expr)
+            if self.error_stream.is_error:
+                self.finish_line(source)
+                return
 
-    def add_brace_expr(self):
-        self.add_expr_instance(BraceExprToken, Triggers.brace_expr)
+            read_size = self.chunk_size
+            if lexer.tokens:
+                yield lexer.tokens
 
-    def add_angle_expr(self):
-        self.add_expr_instance(AngleExprToken, Triggers.angle_expr)
+            if self.error_stream.is_error or (self.eof and lexer.end >= len(self.text)):
+                return
 
+            idx = lexer.end
 
-class Parser:
-    def __init__(self, tokens: list, error_stream: ErrorStream, namespace: base_types.Namespace):
-        self.tokens = tokens
-        self.phases: list = [
-            FunctionCallPhase,
-            ProOperatorPhase,
-            BaseTypeConverterPhase,
-            VariablePlacerPhase,
-            MethodFieldPlacerPhase,
-            UnaryOperatorPhase,
-            OperatorPhase,
-            VarDeclarationPhase,
-            VariablePlacerPhase
-        ]
+    def read(self, idx: int, size: int):  # Drop the text before idx and read up to size more characters
+        if idx:
+            self.line += self.text.count('\n', 0, idx)
+            self.offset += idx
+            self.text = self.text[idx:]
 
-        self.error_stream = error_stream
-        self.namespace = namespace
+        chunk = self.stream.read(size)
+        if chunk:
+            self.text += chunk
+        else:
+            self.eof = True
 
-        self.current_result = self.tokens.copy()
+    def finish_line(self, source: SourceMap):  # Read the rest of the last line, so an error on it is shown in full
+        while not self.eof and not self.text.endswith('\n'):
+            start = len(self.text)
+            self.read(0, self.chunk_size)
 
-    def start(self):
-        for phase in self.phases:
-            parser = phase(self.current_result, self.error_stream, self.namespace)
-            result = parser.start()
-            if self.error_stream.is_error:
+            newline = self.text.find('\n', start)
+            if newline != -1:
+                self.text = self.text[:newline + 1]
                 break
-            else:
-                self.current_result = result
 
-        return self.current_result
+        source.text = self.text
 
 
-class ParsingPhase:
-    def __init__(self, tokens, error_stream: ErrorStream, namespace: base_types.Namespace):
+# Binding powers of the binary operators as (left, right), the operator with the higher power is applied first.
+# A right power lower than the left one makes the operator right associative
+binary_powers = {
+    WordKinds.or_op: (1, 2), WordKinds.and_op: (3, 4),
+    WordKinds.is_op: (7, 8), WordKinds.bigger: (9, 10), WordKinds.smaller: (9, 10),
+    WordKinds.plus: (11, 12), WordKinds.minus: (11, 12),
+    WordKinds.star: (13, 14), WordKinds.slash: (13, 14), WordKinds.percent: (13, 14),
+    WordKinds.caret: (18, 17),
+}
+
+# Binding powers of the operands of the unary operators, so not a is b is not (a is b) and -2 ^ 2 is -(2 ^ 2)
+unary_powers = {WordKinds.not_op: 5, WordKinds.minus: 15}
+
+# What the error messages call a node that is not a name
+node_descriptions = {
+    NumberNode: TypeNames.number_t, StringNode: TypeNames.string_t, BoolNode: TypeNames.bool_t,
+    NullNode: TypeNames.null_t, ReferenceNode: TypeNames.ref_t, ArrayNode: TypeNames.array_t,
+}
+
+
+class Parser:  # Parses the tokens of a statement into expression nodes in one pass, by precedence climbing
+    # The tokens are a list of token objects or a TokenList of a buffer, they are told apart by their code
+    def __init__(self, tokens: list, error_stream: ErrorStream):
         self.tokens = tokens
         self.error_stream = error_stream
-        self.namespace = namespace
 
-        self.idx = -1
-        self.token = None
-        self.result = []
-        self.advance()
+        self.idx = 0
 
-    def start(self):
-        pass
+    def start(self) -> list:
+        nodes = []
+        while self.idx < len(self.tokens):
+            node = self.parse_expression()
+            if node is None:
+                return None
+            nodes.append(node)
 
-    def advance(self, n=1):
-        if self.idx + n >= len(self.tokens):
-            self.token = None
-            return
-        else:
-            self.idx += 1
-            self.token = self.tokens[self.idx]
+        return nodes
 
-    def get_next(self, n=1):
+    def get_next(self, n=0):
         k = self.idx + n
         if k < len(self.tokens):
             return self.tokens[k]
         else:
             return None
 
+    def is_word(self, token, kind: int):
+        return token is not None and token.code == word_code and token.kind == kind
 
-class FunctionCallPhase(ParsingPhase):  # Phase where all function calls are executed
-    def start(self):
-        while self.token is not None:
-            next_tok = self.get_next()
-            if isinstance(self.token, WordToken) and isinstance(next_tok, ParenExprToken):
-                get_func: Function = self.namespace.search_func_by_name(self.token.value)
-                if not get_func:
-                    self.error_stream.add_error(UndefinedErrorException(
-                        f'Name \'{self.token.value}\' is not defined',
-                        self.token.start, next_tok.end, 'when function call was found'
-                    ))
-                else:
-                    # TODO: function accepts arguments
-                    local_namespace = self.namespace.copy()
-                    execute_command(get_func.code.value, self.token.start.loc, self.error_stream, local_namespace)
-
-                    self.idx += 1
+    def parse_expression(self):  # An expression or a declaration
+        if self.is_word(self.get_next(), WordKinds.const):
+            return self.parse_const()
 
-            else:
-                self.result.append(self.token)
+        left = self.parse_operators(0)
+        if left is None:
+            return None
 
-            if self.error_stream.is_error:
-                break
+        equal_sign = self.get_next()
+        if not self.is_word(equal_sign, WordKinds.equals):
+            return left
 
-            self.advance()
-        return self.result
+        self.idx += 1
+        if isinstance(left, ReferenceNode):
+            value = self.parse_value(left, equal_sign, 'while assigning to reference')
+            return value and ReferenceAssignNode(left, value, left.source, left.start_idx, value.end_idx)
 
+        if not self.check_declaration(left):
+            return None
 
-class ProOperatorPhase(ParsingPhase):  # Phase where expressions inside parentheses are executed
-    def start(self):
-        while self.token is not None:
-            if isinstance(self.token, ParenExprToken):
-                tokens_inside = make_tokens(self.token.value, self.token.start.loc, self.error_stream, self.namespace)
+        value = self.parse_value(left, equal_sign, 'while assigning value to variable')
+        return value and AssignNode(left, value, left.source, left.start_idx, value.end_idx)
 
-                if self.error_stream.is_error:
-                    return
-                else:
-                    for tok in tokens_inside:
-                        self.result.append(tok)
-            else:
-                self.result.append(self.token)
+    def parse_const(self):
+        const = self.get_next()
+        self.idx += 1
 
-            self.advance()
+        # If there is nothing next to const keyword
+        if self.get_next() is None:
+            self.error_stream.add_error(SyntaxErrorException(
+                'Expected some name after const keyword',
+                const.start, const.end,
+                'when constant declaration was found',
+                f'foo = '
+            ))
+            return None
 
-        return self.result
+        name = self.parse_primary()
+        if name is None or not self.check_declaration(name, is_const=True):
+            return None
 
+        equal_sign = self.get_next()
+        if not self.is_word(equal_sign, WordKinds.equals):
+            return ConstNode(name, None, const.source, const.start_idx, name.end_idx)
 
-class BaseTypeConverterPhase(ParsingPhase):
-    def start(self):
-        while self.token is not None:
-            converted = self.token_to_type(self.token)
+        self.idx += 1
+        value = self.parse_value(name, equal_sign, 'while assigning value to constant')
+        return value and ConstNode(name, value, const.source, const.start_idx, value.end_idx)
 
-            if self.error_stream.is_error:
-                return
+    def parse_value(self, name: Node, equal_sign: Token, context: str):  # The value after = sign
+        if self.get_next() is None:
+            self.error_stream.add_error(SyntaxErrorException(
+                'Expected some value after = sign',
+                name.start, equal_sign.end,
+                context,
+                '= null'
+            ))
+            return None
 
-            self.result.append(converted)
-            self.advance()
-        return self.result
+        return self.parse_expression()
 
-    def token_to_type(self, token: Token):
-        next_tok = self.get_next()
+    def parse_operators(self, min_power: int):
+        left = self.parse_unary()
 
-        if isinstance(token, WordToken):
-            if token.value in base_types.bool_values:
-                return base_types.Bool(True if token.value == base_types.bool_true else False, token.start,
-                                       token.end)
+        while left is not None:
+            operator = self.get_next()
+            if operator is None or operator.code != word_code:
+                break
 
-            elif token.value == 'ref' or token.value == '&' and isinstance(next_tok, WordToken):
-                self.idx += 1
-                return base_types.ReferenceType(next_tok.value, token.start, next_tok.end)
+            powers = binary_powers.get(operator.kind)
+            if powers is None or powers[0] < min_power:
+                break
 
-            elif token.value == 'null':
-                return base_types.Null(token.start, token.end)
+            self.idx += 1
+            if self.get_next() is None:
+                self.error_stream.add_error(SyntaxErrorException(
+                    f'Expected some value after {operator.value}',
+                    left.start, operator.end, 'while parsing operator'
+                ))
+                return None
 
-            else:
-                return token
+            right = self.parse_operators(powers[1])
+            if right is None:
+                return None
 
-        elif isinstance(token, NumberToken):
-            dec = decimal.Decimal(token.value)
-            return base_types.Number(dec, token.start, token.end)
+            left = BinaryOpNode(operator.kind, operator.value, left, right, left.source, left.start_idx, right.end_idx)
 
-        elif isinstance(token, StringToken):
-            return base_types.String(token.value, token.start, token.end)
+        return left
 
-        # Generate an array
-        elif isinstance(token, BracketExprToken):
-            arr_tokens = make_tokens(token.value, token.start.loc, self.error_stream, self.namespace)
-            if arr_tokens is not None:
-                return base_types.Array(arr_tokens, token.start, token.end)
+    def parse_unary(self):
+        operator = self.get_next()
+        if operator is None or operator.code != word_code or operator.kind not in unary_powers:
+            return self.parse_property()
 
-        else:
-            return token
+        self.idx += 1
+        if self.get_next() is None:
+            self.error_stream.add_error(SyntaxErrorException(
+                f'Expected some value after {operator.value}',
+                operator.start, operator.end, 'while parsing unary operator'
+            ))
+            return None
 
+        operand = self.parse_operators(unary_powers[operator.kind])
+        return operand and UnaryOpNode(operator.kind, operator.value, operand,
+                                       operator.source, operator.start_idx, operand.end_idx)
 
-class VariablePlacerPhase(ParsingPhase):
-    def start(self):
-        while self.token is not None:
+    def parse_property(self):
+        value = self.parse_primary()
 
-            if isinstance(self.token, WordToken) and (var := self.namespace.search_not_func(self.token.value)):
-                self.result.append(var.value)
-            else:
-                self.result.append(self.token)
+        while value is not None and self.is_word(self.get_next(), WordKinds.dot):
+            dot = self.get_next()
+            prop_name = self.get_next(1)
+            if not self.is_word(prop_name, WordKinds.name):
+                self.error_stream.add_error(SyntaxErrorException(
+                    'Expected some property name after .',
+                    value.start, dot.end, 'while getting property of object'
+                ))
+                return None
 
-            self.advance()
+            self.idx += 2
+            value = PropertyNode(value, prop_name.value, value.source, value.start_idx, prop_name.end_idx)
 
-        return self.result
+        return value
 
+    def parse_primary(self):
+        token = self.get_next()
+        self.idx += 1
 
-class MethodFieldPlacerPhase(ParsingPhase):
-    def start(self):
-        while self.token is not None:
-            next_tok = self.get_next()
-            if isinstance(self.token, Any) and isinstance(next_tok, WordToken) and next_tok.value == '.':
-                prop_name = self.get_next(2)
+        code = token.code
+        if code == NumberToken.code:
+            return NumberNode(numeric.current.literal(token.value), token.source, token.start_idx, token.end_idx)
 
-                if not isinstance(prop_name, WordToken):
-                    pass  # TODO: return error expected some property
+        elif code == StringToken.code:
+            return StringNode(token.value, token.source, token.start_idx, token.end_idx)
 
-                get_prop = self.token.properties.search_by_name(prop_name.value)
-                if not get_prop:
-                    self.error_stream.add_error(ValueErrorException(
-                        f'Object type {self.token.type_name} does not have property  \'{prop_name.value}\'',
-                        self.token.start_pos, prop_name.end, 'while getting property of object'
-                    ))
-                    return
-                else:
-                    self.idx += 2
-                    self.result.append(get_prop.value)
+        elif code == word_code:
+            return self.parse_word(token)
 
+        # One expression in parentheses, it is parsed on its own so it is applied before the operators around it
+        elif code == ParenExprToken.code:
+            nodes = Parser(token.children, self.error_stream).start()
+            if nodes is None:
+                return None
 
-            else:
-                self.result.append(self.token)
+            if len(nodes) != 1:
+                self.error_stream.add_error(SyntaxErrorException(
+                    f'Expected one expression inside parentheses, got {len(nodes)}',
+                    token.start, token.end, 'while parsing parentheses'
+                ))
+                return None
 
-            if self.error_stream.is_error:
-                return
+            return nodes[0]
 
-            self.advance()
+        # Generate an array
+        elif code == BracketExprToken.code:
+            elements = Parser(token.children, self.error_stream).start()
+            return None if elements is None else ArrayNode(elements, token.source, token.start_idx, token.end_idx)
 
-        return self.result
+        self.error_stream.add_error(SyntaxErrorException(
+            f'Unexpected {token.type}', token.start, token.end, 'while parsing expression'
+        ))
+        return None
 
+    def parse_word(self, token: WordToken):
+        next_tok = self.get_next()
 
-class UnaryOperatorPhase(ParsingPhase):
-    def start(self):
-        while self.token is not None:
-            if isinstance(self.token, WordToken) and self.token.value in unary_operators:
-                un_var = self.get_next()
-                op = self.token.value
-                if op == '-':
-                    self.apply_operator(self.token, un_var, un_var.operator_unary_minus)
-                elif op == 'not':
-                    self.apply_operator(self.token, un_var, un_var.operator_unary_not)
+        if token.kind == WordKinds.name:
+            if next_tok is not None and next_tok.code == ParenExprToken.code:
                 self.idx += 1
+                return CallNode(token.value, next_tok.children, token.source, token.start_idx, next_tok.end_idx)
 
-            else:
-                self.result.append(self.token)
-
-            if self.error_stream.is_error:
-                return
+            return NameNode(token.value, token.source, token.start_idx, token.end_idx)
 
-            self.advance()
+        elif token.kind == WordKinds.true or token.kind == WordKinds.false:
+            return BoolNode(token.kind == WordKinds.true, token.source, token.start_idx, token.end_idx)
 
-        return self.result
+        elif token.kind == WordKinds.null:
+            return NullNode(token.source, token.start_idx, token.end_idx)
 
-    def apply_operator(self, operator, right, func):
-        result = func()
-
-        if isinstance(result, Error):
-            self.error_stream.add_error(result)
-        elif not result:
-            self.error_stream.add_error(UnsupportedOperationException(
-                f'Unsupported unary operator {operator.value} for type {right.type_name}',
-                operator.start, right.end_pos
-            ))
-        else:
-            self.result.append(result)
-
-
-class OperatorPhase(ParsingPhase):  # Phase where expressions with operators like 1 + 1 are executed
-    def start(self):
-        while self.token is not None:
-            next1: Token = self.get_next(1)
-            next2: base_types.Any = self.get_next(2)
-
-            # Apply the overloaded operators like +, -, /, *, ^, %
-            if self.can_apply_operator(self.token, next1, next2):
-                op = next1.value
-
-                if op == '+':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_add)
-                elif op == '-':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_sub)
-                elif op == '*':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_mul)
-                elif op == '/':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_div)
-                elif op == '%':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_mod)
-                elif op == '^':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_pow)
-                elif op == '>':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_bigger)
-                elif op == '<':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_smaller)
-                elif op == 'is':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_equal)
-                elif op == 'and':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_and)
-                elif op == 'or':
-                    self.apply_operator(self.token, next1, next2, self.token.operator_or)
-
-                self.idx += 2
-
-            else:
-                self.result.append(self.token)
-
-            if self.error_stream.is_error:
-                return
+        elif token.kind == WordKinds.ref or token.kind == WordKinds.ampersand:
+            if not self.is_word(next_tok, WordKinds.name):
+                self.error_stream.add_error(SyntaxErrorException(
+                    f'Expected some name after {token.value}',
+                    token.start, token.end, 'while parsing reference'
+                ))
+                return None
 
-            self.advance()
+            self.idx += 1
+            return ReferenceNode(next_tok.value, token.source, token.start_idx, next_tok.end_idx)
 
-        return self.result
+        self.error_stream.add_error(SyntaxErrorException(
+            f'Unexpected {token.value}', token.start, token.end, 'while parsing expression'
+        ))
+        return None
 
-    def can_apply_operator(self, left, operator: Token, right):
-        return (
-                isinstance(left, base_types.Any) and
-                isinstance(operator, WordToken) and
-                operator.value in base_types.operators and
-                isinstance(right, base_types.Any)
-        )
+    def check_declaration(self, var: Node, is_const=False):
+        # If var is not a name, for example it is string or number
+        if not isinstance(var, NameNode):
+            if isinstance(var, (BoolNode, NullNode)):
+                self.error_stream.add_error(SyntaxErrorException(
+                    f'Cannot assign to literal ({var.source.text[var.start_idx:var.end_idx]})',
+                    var.start, var.end,
+                    'while parsing declaration name'
+                ))
+                return False
 
-    def apply_operator(self, left, operator, right, func):
-        result = func(right)
+            # TODO: add array unpacking here
+            if isinstance(var, StringNode):
+                hint = var.value
+            elif isinstance(var, NumberNode):
+                hint = f'foo_{var.value}'
+            else:
+                hint = 'foo'
 
-        if isinstance(result, Error):
-            self.error_stream.add_error(result)
+            self.error_stream.add_error(SyntaxErrorException(
+                ('Constant' if is_const else 'Variable') +
+                f' name should be a word, not {node_descriptions.get(type(var), "expression")}',
+                var.start, var.end,
+                'when declaration was found',
+                hint
+            ))
+            return False
 
-        elif not result:
-            self.error_stream.add_error(UnsupportedOperationException(
-                f'Unsupported operation {operator.value} between types {left.type_name} and {right.type_name}',
-                left.start_pos, right.end_pos
+        # Check variable name to be valid
+        elif not check_var_name(var.name):
+            self.error_stream.add_error(SyntaxErrorException(
+                f'Name {var.name} is not valid for a constant or variable',
+                var.start, var.end,
+                'while parsing declaration name'
             ))
+            return False
 
-        else:
-            self.result.append(result)
+        return True
 
 
 def check_var_name(name: str):
@@ -605,191 +677,80 @@ def check_var_name(name: str):
     return True
 
 
-class VarDeclarationPhase(ParsingPhase):
-    def start(self):
-        while self.token is not None:
-            # Check for constant declaration
-            next_tok = self.get_next()
-            if isinstance(self.token, WordToken) and self.token.value == 'const':
-                self.declare_const()
-
-            elif isinstance(next_tok, WordToken) and next_tok.value == '=':
-                if isinstance(self.token, ReferenceType):
-                    self.declare_from_ref()
-                else:
-                    self.declare_var()
-
-            else:
-                self.result.append(self.token)
-
-            if self.error_stream.is_error:
-                return
-
-            self.advance()
-
-        return self.result
-
-    def declare_const(self):
-        var_name = self.get_next()
-
-        self.check_declaration(var_name, is_const=True)
+def make_tokens(text: str, file_name: str, error_stream: ErrorStream, namespace: base_types.Namespace,
+                keep_results: bool = True):
+    # The statements are run one by one like the ones of a streamed file, so a newline outside of any group ends a
+    # statement here too. Returns the values of every statement
+    statements = Lexer(file_name, text, error_stream).statements()
+    if error_stream.is_error:
+        return
 
-        if self.error_stream.is_error:
+    results = []
+    for tokens in statements:
+        result = parse_tokens(tokens, error_stream, namespace, keep_results)
+        if error_stream.is_error:
             return
+        results += result
 
-        # Now parse the value
-        equal_sign = self.get_next(2)
-        if not isinstance(equal_sign, WordToken) or equal_sign.value != '=':
-            self.namespace.add_const(base_types.Constant(
-                var_name.value, base_types.Null(self.token.start, var_name.end)
-            ))
-            self.result.append(Null(self.token.start, var_name.end))
-            self.advance()
-            return
+    return results
 
-        var_value = self.get_next(3)
 
-        self.check_var_value(var_value, var_name, equal_sign)
-        if self.error_stream.is_error:
-            return
+def parse_tokens(tokens: list, error_stream: ErrorStream, namespace: base_types.Namespace,
+                 keep_results: bool = True, optimize_level: int = None):
+    # The literals, the folded operators and the code are in the number mode of the namespace
+    with namespace.numbers.use():
+        code = compile_tokens(tokens, error_stream, keep_results, optimize_level)
+        if code is None:
+            return None
 
-        self.namespace.remove_by_name(var_name.value)
+        result = vm.VM(error_stream, namespace).run(code)
 
-        self.namespace.add_const(Constant(var_name.value, var_value))
-        self.result.append(var_value)
+    return None if error_stream.is_error else result
 
-        for _ in range(3):
-            self.advance()
 
-    def declare_var(self):
-        self.check_declaration(self.token)
-        if self.error_stream.is_error:
-            return
+def compile_tokens(tokens: list, error_stream: ErrorStream, keep_results: bool = True, optimize_level: int = None):
+    # keep_results is False when the values of the statement are not used, optimize_level defaults to optimizer.level
+    nodes = Parser(tokens, error_stream).start()
+    if error_stream.is_error:
+        return None
 
-        equal_sign = self.get_next()
-        var_value = self.get_next(2)
-        self.check_var_value(var_value, self.token, equal_sign)
-        if self.error_stream.is_error:
-            return
+    nodes = optimizer.Optimizer(optimizer.level if optimize_level is None else optimize_level, keep_results).start(nodes)
+    return compiler.Compiler().start(nodes)
 
-        self.namespace.add_var(Variable(self.token.value, var_value))
-        self.result.append(var_value)
 
-        for _ in range(2):
-            self.advance()
+def compile_command(text: str, file_name: str, error_stream: ErrorStream) -> list:
+    # The codes of the statements of a text whose values are not used, like the body of a function. None after an error
+    statements = Lexer(file_name, text, error_stream).statements()
+    if error_stream.is_error:
+        return None
 
-    def declare_from_ref(self):
-        var_name = self.token.name
-        search: Variable = self.namespace.search_by_name(var_name)
-        if not search:
-            self.error_stream.add_error(ValueErrorException(
-                f'Cannot assign to reference that refers to an undefined object',
-                self.token.start_pos, self.token.end_pos,
-                'while assigning to reference'
-            ))
-            return
-        assign_to = self.get_next(2)
-        if not isinstance(assign_to, Any):
-            eq_sign = self.get_next()
-            self.error_stream.add_error(SyntaxErrorException(
-                f'Expected some value to assign to',
-                self.token.start_pos, eq_sign.end,
-                'while assigning to reference'
-            ))
-            return
+    codes = []
+    for tokens in statements:
+        code = compile_tokens(tokens, error_stream, keep_results=False)
+        if code is None:
+            return None
+        codes.append(code)
 
-        search.value = assign_to
-        self.result.append(assign_to)
+    return codes
 
-        self.idx += 2
 
-    def check_declaration(self, var, is_const=False):
-        # If there is nothing next to const keyword
-        if is_const and not var:
-            self.error_stream.add_error(SyntaxErrorException(
-                'Expected some name after const keyword',
-                self.token.start, self.token.end,
-                'when constant declaration was found',
-                f'foo = '
-            ))
-            return
+def execute_stream(stream, file_name: str, error_stream: ErrorStream, namespace: base_types.Namespace):
+    # Every statement is executed as soon as it is read, yields the result of each one
+    yield from execute_statements(StreamLexer(file_name, stream, error_stream).statements(), error_stream, namespace)
 
-        # If var is not a word, for example it is string or number
-        elif not isinstance(var, WordToken):
-            if isinstance(var, Token):
-                type_name = var.type
-                start_pos = var.start
-                end_pos = var.end
-            else:
-                type_name = var.type_name
-                start_pos = var.start_pos
-                end_pos = var.end_pos
-            # TODO: add array unpacking here
-            if isinstance(var, base_types.String):
-                hint = var.value
-            elif isinstance(var, base_types.Number):
-                hint = f'foo_{var.value}'
-            else:
-                hint = 'foo'
 
-            self.error_stream.add_error(SyntaxErrorException(
-                'Constant' if is_const else 'Variable' + f' name should be a word, not {type_name}',
-                start_pos, end_pos,
-                'when declaration was found',
-                hint
-            ))
-            return
-
-        # Check variable name to be valid
-        elif not check_var_name(var.value):
-            self.error_stream.add_error(SyntaxErrorException(
-                f'Name {var.value} is not valid for a constant or variable',
-                var.start, var.end,
-                'while parsing declaration name'
-            ))
-            return
-
-        # Check value to be in special variables
-        elif var.value in base_types.special_vars:
-            self.error_stream.add_error(SyntaxErrorException(
-                f'Cannot assign to literal ({var.value})',
-                var.start, var.end,
-                'while parsing declaration name'
-            ))
+def execute_statements(statements, error_stream: ErrorStream, namespace: base_types.Namespace):
+    # Executes the token lists of top-level statements in order, yields the result of each one
+    for tokens in statements:
+        result = parse_tokens(tokens, error_stream, namespace)
+        if error_stream.is_error:
             return
 
-        # Check if name is already a constant
-        elif self.namespace.search_const_by_name(var.value):
-            self.error_stream.add_error(ValueErrorException(
-                f'Name {var.value} is already taken by a constant',
-                var.start, var.end, 'when declaring ' + 'constant' if is_const else 'variable'
-            ))
-
-    def check_var_value(self, var_value, var_name, equal_sign):
-        if not isinstance(var_value, Any) or var_value is None:
-            self.error_stream.add_error(SyntaxErrorException(
-                'Expected some value after = sign',
-                var_name.start, equal_sign.end,
-                'while assigning value to constant',
-                '= null'
-            ))
-
-
-def make_tokens(text: str, file_name: str, error_stream: ErrorStream, namespace: base_types.Namespace):
-    lex = Lexer(file_name, text, error_stream)
-    tokens = lex.start()
-
-    if error_stream.is_error:
-        return
-
-    parser = Parser(tokens, error_stream, namespace)
-    result = parser.start()
-
-    return None if error_stream.is_error else result
+        yield result
 
 
 def execute_command(text: str, file_name: str, error_stream: ErrorStream, namespace: Namespace):
-    tokens = make_tokens(text, file_name, error_stream, namespace)
+    tokens = make_tokens(text, file_name, error_stream, namespace, keep_results=False)
 
     if error_stream.is_error:
         return
@@ -0,0 +1,191 @@
+from tokens import Position, SourceMap
+
+
+class Node:  # start and end are offsets into the text of the node's source, like for tokens
+    def __init__(self, source: SourceMap, start: int, end: int):
+        self.source = source
+        self.start_idx = start
+        self.end_idx = end
+
+    @property
+    def start(self):
+        return Position(self.source, self.source.offset + self.start_idx)
+
+    @property
+    def end(self):
+        return Position(self.source, self.source.offset + self.end_idx)
+
+    @property
+    def span(self):  # Positions of the value of the node, for errors about it
+        return self.start, self.end
+
+
+# Literals
+class NumberNode(Node):
+    def __init__(self, value, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.value = value
+
+    def __repr__(self):
+        return f'NumberNode({self.value})'
+
+
+class StringNode(Node):
+    def __init__(self, value: str, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.value = value
+
+    def __repr__(self):
+        return f'StringNode({self.value!r})'
+
+
+class BoolNode(Node):
+    def __init__(self, value: bool, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.value = value
+
+    def __repr__(self):
+        return f'BoolNode({self.value})'
+
+
+class NullNode(Node):
+    def __repr__(self):
+        return 'NullNode()'
+
+
+class ReferenceNode(Node):  # ref name or &name
+    def __init__(self, name: str, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.name = name
+
+    def __repr__(self):
+        return f'ReferenceNode({self.name})'
+
+
+class ArrayNode(Node):
+    def __init__(self, elements: list, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.elements = elements
+
+    def __repr__(self):
+        return f'ArrayNode({self.elements})'
+
+
+# Names and operations
+class NameNode(Node):
+    def __init__(self, name: str, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.name = name
+
+    def __repr__(self):
+        return f'NameNode({self.name})'
+
+
+class CallNode(Node):  # name(...), the arguments are kept as tokens until functions accept them
+    def __init__(self, name: str, arguments: list, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.name = name
+        self.arguments = arguments
+
+    def __repr__(self):
+        return f'CallNode({self.name})'
+
+
+class PropertyNode(Node):  # value.name
+    def __init__(self, value: Node, name: str, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.value = value
+        self.name = name
+
+    def __repr__(self):
+        return f'PropertyNode({self.value}, {self.name})'
+
+
+class UnaryOpNode(Node):  # The operator is a WordKinds value, op is its text for error messages
+    def __init__(self, operator: int, op: str, operand: Node, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.operator = operator
+        self.op = op
+        self.operand = operand
+
+    def __repr__(self):
+        return f'UnaryOpNode({self.op}, {self.operand})'
+
+
+class BinaryOpNode(Node):
+    def __init__(self, operator: int, op: str, left: Node, right: Node, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.operator = operator
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def __repr__(self):
+        return f'BinaryOpNode({self.op}, {self.left}, {self.right})'
+
+
+# Declarations, they evaluate to the assigned value
+class AssignNode(Node):  # name = value
+    def __init__(self, name: NameNode, value: Node, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.name = name
+        self.value = value
+
+    def __repr__(self):
+        return f'AssignNode({self.name.name}, {self.value})'
+
+    @property
+    def span(self):
+        return self.value.span
+
+
+class ConstNode(Node):  # const name = value, or const name which is null
+    def __init__(self, name: NameNode, value: Node, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.name = name
+        self.value = value
+
+    def __repr__(self):
+        return f'ConstNode({self.name.name}, {self.value})'
+
+    @property
+    def span(self):
+        return self.value.span if self.value else (self.start, self.end)
+
+
+class ReferenceAssignNode(Node):  # ref name = value, assigns to the variable the reference refers to
+    def __init__(self, reference: ReferenceNode, value: Node, source: SourceMap, start: int, end: int):
+        super().__init__(source, start, end)
+        self.reference = reference
+        self.value = value
+
+    def __repr__(self):
+        return f'ReferenceAssignNode({self.reference.name}, {self.value})'
+
+    @property
+    def span(self):
+        return self.value.span
+
+
+# Made by the optimizer
+class SaveNode(Node):  # Evaluates value and keeps it in the temporary slot for a ReuseNode
+    def __init__(self, value: Node, slot: int):
+        super().__init__(value.source, value.start_idx, value.end_idx)
+        self.value = value
+        self.slot = slot
+
+    def __repr__(self):
+        return f'SaveNode({self.slot}, {self.value})'
+
+    @property
+    def span(self):
+        return self.value.span
+
+
+class ReuseNode(Node):  # The value of an earlier identical expression, see optimizer.Optimizer.eliminate
+    def __init__(self, value: Node, slot: int):
+        super().__init__(value.source, value.start_idx, value.end_idx)
+        self.slot = slot
+
+    def __repr__(self):
+        return f'ReuseNode({self.slot})'
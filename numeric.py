@@ -0,0 +1,83 @@
+import contextlib
+import decimal
+import math
+from decimal import Decimal
+
+
+class NumberMode:
+    # How the numbers of a program are kept. Without integers every number is a Decimal. With integers, integral
+    # literals and results are exact ints and the other numbers are of the fraction type, float or Decimal.
+    # Decimals are computed in context, or in the current decimal context when it is None
+    def __init__(self, integers: bool = False, fraction: type = Decimal, context: decimal.Context = None):
+        self.integers = integers
+        self.fraction = fraction
+        self.context = context
+
+    def __repr__(self):
+        return f'NumberMode(integers={self.integers}, fraction={self.fraction.__name__})'
+
+    def literal(self, text: str):  # The value of a number literal, text is digits with at most one dot
+        if not self.integers:
+            return Decimal(text)
+        elif '.' in text:
+            return self.fraction(text)
+
+        return int(text)
+
+    @contextlib.contextmanager
+    def use(self):  # Makes this mode the current one while code is compiled and run
+        global current
+        previous = current
+        current = self
+        try:
+            if self.context is None:
+                yield self
+            else:
+                with decimal.localcontext(self.context):
+                    yield self
+        finally:
+            current = previous
+
+
+decimal_mode = NumberMode()
+int_float_mode = NumberMode(integers=True, fraction=float)
+int_decimal_mode = NumberMode(integers=True, fraction=Decimal)
+
+# The mode of namespaces made without a mode, and the mode of the namespace code is running in
+default = decimal_mode
+current = default
+
+
+# Operations that depend on the types of the numbers. The others are done by Python, which keeps int with int an
+# int, and turns int with a float or a Decimal into the other type
+def divide(left, right):
+    if type(left) is int and type(right) is int:
+        quotient, remainder = divmod(left, right)
+        if not remainder:
+            return quotient
+
+        if current.fraction is float:
+            return left / right
+        return Decimal(left) / Decimal(right)
+
+    return left / right
+
+
+def remainder(left, right):  # Has the sign of left like the remainder of two Decimals
+    if isinstance(left, Decimal) or isinstance(right, Decimal):
+        return left % right
+
+    result = abs(left) % abs(right)
+    return -result if left < 0 else result
+
+
+def power(left, right):
+    if type(right) is int and (right >= 0 or type(left) is not int):
+        return left ** right
+    elif isinstance(left, Decimal) or isinstance(right, Decimal):
+        return Decimal(left) ** Decimal(right)
+    elif type(left) is int and current.fraction is not float:
+        return Decimal(left) ** right
+
+    # math.pow fails instead of making a complex number
+    return math.pow(left, right)
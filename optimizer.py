@@ -0,0 +1,173 @@
+from base_types import *
+from nodes import *
+
+# Level 0 runs the program as it is written, 1 folds operators on literals and drops literals whose value is
+# not used, 2 also evaluates repeated expressions only once. Used when no level is given to lexer.parse_tokens
+level = 1
+
+# Literals, their values are made by the compiler and can never fail
+literal_nodes = NumberNode, StringNode, BoolNode, NullNode, ReferenceNode
+
+# Node of a literal of each value type the operators can make, only these literals are folded
+folded_nodes = {Number: NumberNode, String: StringNode, Bool: BoolNode}
+folded_literals = NumberNode, StringNode, BoolNode
+
+# Nodes that change variables or run other code, repeated expressions around them are evaluated again
+effect_nodes = AssignNode, ConstNode, ReferenceAssignNode, CallNode
+
+
+class Optimizer:  # Rewrites the nodes of a statement so they run faster with the same values and errors
+    def __init__(self, level: int, keep_results: bool = True):
+        self.level = level
+        self.keep_results = keep_results
+
+        # For eliminate
+        self.counts = {}
+        self.keys = {}  # Expression keys by node id, the nodes are alive as long as the optimizer
+        self.slots = {}
+        self.epoch = 0
+
+    def start(self, nodes: list) -> list:
+        if self.level >= 1:
+            nodes = [self.fold(node) for node in nodes]
+            if not self.keep_results:
+                nodes = [node for node in nodes if not self.cannot_fail(node)]
+
+        if self.level >= 2:
+            nodes = self.eliminate(nodes)
+
+        return nodes
+
+    def map_children(self, node: Node, func):  # Replaces the children of node with func(child), in the order they run
+        if isinstance(node, BinaryOpNode):
+            node.left = func(node.left)
+            node.right = func(node.right)
+        elif isinstance(node, UnaryOpNode):
+            node.operand = func(node.operand)
+        elif isinstance(node, PropertyNode):
+            node.value = func(node.value)
+        elif isinstance(node, ArrayNode):
+            node.elements = [func(element) for element in node.elements]
+        elif isinstance(node, (AssignNode, ConstNode, ReferenceAssignNode)) and node.value:
+            node.value = func(node.value)
+
+    def cannot_fail(self, node: Node):
+        if isinstance(node, ArrayNode):
+            return all(self.cannot_fail(element) for element in node.elements)
+
+        return isinstance(node, literal_nodes)
+
+    # Constant folding
+    def fold(self, node: Node):
+        self.map_children(node, self.fold)
+
+        if isinstance(node, BinaryOpNode) and isinstance(node.left, folded_literals) and \
+                isinstance(node.right, folded_literals):
+            left = self.literal_value(node.left)
+            right = self.literal_value(node.right)
+            return self.folded(node, lambda: binary_operation(left, node.operator, right))
+
+        elif isinstance(node, UnaryOpNode) and isinstance(node.operand, folded_literals):
+            operand = self.literal_value(node.operand)
+            return self.folded(node, lambda: unary_operation(node.operator, operand))
+
+        return node
+
+    def literal_value(self, node: Node):
+        if isinstance(node, NumberNode):
+            return Number(node.value)
+        elif isinstance(node, StringNode):
+            return String(node.value)
+        else:
+            return to_bool(node.value)
+
+    def folded(self, node: Node, apply):
+        # The operation is left to run when it fails, so the error is reported as usual
+        try:
+            result = apply()
+        except Exception:
+            return node
+
+        node_class = folded_nodes.get(type(result))
+        if node_class is None:
+            return node
+
+        return node_class(result.value, node.source, node.start_idx, node.end_idx)
+
+    # Common subexpression elimination. The first of the identical expressions between two nodes with effects
+    # saves its value, the others reuse it
+    def eliminate(self, nodes: list) -> list:
+        for node in nodes:
+            self.count(node)
+
+        self.epoch = 0
+        return [self.rewrite(node) for node in nodes]
+
+    def expression_key(self, node: Node):  # Equal for expressions with the same value, None for the others
+        key = self.keys.get(id(node), False)
+        if key is False:
+            key = self.keys[id(node)] = self.make_key(node)
+
+        return key
+
+    def make_key(self, node: Node):
+        if isinstance(node, NameNode):
+            return 'name', node.name
+        elif isinstance(node, NumberNode):
+            return 'number', str(node.value)
+        elif isinstance(node, StringNode):
+            return 'string', node.value
+        elif isinstance(node, BoolNode):
+            return 'bool', node.value
+        elif isinstance(node, NullNode):
+            return 'null',
+        elif isinstance(node, UnaryOpNode):
+            operand = self.expression_key(node.operand)
+            return operand and ('unary', node.operator, operand)
+        elif isinstance(node, BinaryOpNode):
+            left = self.expression_key(node.left)
+            right = left and self.expression_key(node.right)
+            return right and ('binary', node.operator, left, right)
+        elif isinstance(node, PropertyNode):
+            value = self.expression_key(node.value)
+            return value and ('property', value, node.name)
+
+        return None
+
+    def repeated_key(self, node: Node):  # Key of an operation that is worth saving, with the current epoch
+        if not isinstance(node, (UnaryOpNode, BinaryOpNode, PropertyNode)):
+            return None
+
+        key = self.expression_key(node)
+        return key and (key, self.epoch)
+
+    def count(self, node: Node):
+        key = self.repeated_key(node)
+        if key:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            # A repeated expression is not evaluated again, and neither are its parts
+            if self.counts[key] > 1:
+                return node
+
+        self.map_children(node, self.count)
+        if isinstance(node, effect_nodes):
+            self.epoch += 1
+
+        return node
+
+    def rewrite(self, node: Node):
+        key = self.repeated_key(node)
+        if key and self.counts[key] > 1:
+            slot = self.slots.get(key)
+            if slot is not None:
+                return ReuseNode(node, slot)
+
+            self.map_children(node, self.rewrite)
+            self.slots[key] = len(self.slots)
+            return SaveNode(node, self.slots[key])
+
+        self.map_children(node, self.rewrite)
+        if isinstance(node, effect_nodes):
+            self.epoch += 1
+
+        return node
@@ -1,15 +1,22 @@
 import decimal
 
 import base_types
+import cache
 import errors
 import lexer
 
 
 def main():
-    with open('code.txt', 'r') as f:
-        text = f.read()
+    error_stream = errors.ErrorStream()
+    namespace = base_types.Namespace()
+
+    # The tokens of the file are loaded from its cache file when it did not change since the last run,
+    # otherwise the file is executed statement by statement while it is read and the cache file is written
+    for result in lexer.execute_statements(cache.statements('code.txt', error_stream), error_stream, namespace):
+        for i in result:
+            print(i)
 
-    execute_command(text)
+    check_error(error_stream)
 
 
 def check_error(e: errors.ErrorStream):
@@ -0,0 +1,269 @@
+import io
+import random
+
+import pytest
+
+import base_types
+import cache
+import errors
+import lexer
+import numeric
+from benchmarks import corpora
+from tokens import *
+
+# Random inputs are made of these chars, so they hit groups, strings, escapes, numbers and errors
+alphabet = 'ab1_.=+-*( )[]<>"\'`\\# \n\n\nx9'
+
+
+def random_texts(seed: int, count: int, max_size: int = 40):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_size))) for _ in range(count)]
+
+
+def dump(tokens) -> list:  # Tokens as plain tuples, with their positions in the whole file
+    return [(token.type, token.value, token.start.idx, token.end.idx, token.start.line, token.start.col,
+             dump(token.children) if token.code >= first_group_code else None) for token in tokens]
+
+
+def lex(text: str):  # Tokens and errors of the whole text lexed at once
+    error_stream = errors.ErrorStream()
+    tokens = lexer.Lexer('f', text, error_stream).start()
+    return (None if error_stream.is_error else dump(tokens)), error_stream.as_string()
+
+
+def check_tokens(tokens: list, text: str, start: int, end: int):
+    for token in tokens:
+        assert start <= token.start_idx < token.end_idx <= end
+        lexeme = text[token.start_idx:token.end_idx]
+
+        if token.code == word_code:
+            assert token.value == lexeme
+        elif token.code == number_code:
+            assert token.value == number_value(lexeme)
+        elif token.code == string_code:
+            assert token.value == string_value(lexeme[1:-1], lexeme[0])
+        else:
+            check_tokens(token.children, text, token.start_idx + 1, token.end_idx - 1)
+        start = token.end_idx
+
+
+def test_lexer_tokens_match_source():
+    for text in random_texts(1, 3000):
+        error_stream = errors.ErrorStream()
+        tokens = lexer.Lexer('f', text, error_stream).start()
+        if not error_stream.is_error:
+            check_tokens(tokens, text, 0, len(text))
+
+
+def test_corpora_lex_without_errors():
+    for name in corpora.corpora:
+        text = corpora.generate(name, 20000, 1)
+        error_stream = errors.ErrorStream()
+        check_tokens(lexer.Lexer('f', text, error_stream).start(), text, 0, len(text))
+        assert not error_stream.is_error, name
+
+
+def stream(text: str, chunk_size: int, filename: str = 'f'):  # Tokens and errors of the text read in chunks
+    error_stream = errors.ErrorStream()
+    statements = lexer.StreamLexer(filename, io.StringIO(text), error_stream, chunk_size).statements()
+    tokens = [token for statement in statements for token in statement]
+    return (None if error_stream.is_error else dump(tokens)), error_stream.as_string()
+
+
+def test_stream_lexer_matches_lexer():
+    rng = random.Random(2)
+    for text in random_texts(2, 5000):
+        assert stream(text, rng.randint(1, 8)) == lex(text), text
+
+
+def test_stream_lexer_escape_at_chunk_end():
+    text = 'x = "ab\\"cd"\n'
+    for chunk_size in range(1, len(text) + 1):
+        assert stream(text, chunk_size) == lex(text), chunk_size
+
+    # A backslash that is the last char of a chunk in a string longer than the chunk
+    chunk_size = 64
+    for idx in range(chunk_size - 4, chunk_size + 4):
+        body = 'a' * idx + '\\`' + 'b' * chunk_size * 2
+        text = f'doc = `{body}`\nx = 1\n'
+        assert stream(text, chunk_size) == lex(text), idx
+
+
+def test_incremental_lexer_matches_lexer():
+    rng = random.Random(3)
+    for text in random_texts(3, 1500):
+        incremental = lexer.IncrementalLexer('f', text)
+        for _ in range(8):
+            offset = rng.randint(0, len(text))
+            deleted = rng.randint(0, min(3, len(text) - offset))
+            inserted = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 3)))
+            text = text[:offset] + inserted + text[offset + deleted:]
+
+            tokens = incremental.edit(offset, deleted, inserted)
+            error_stream = incremental.error_stream
+            assert ((None if error_stream.is_error else dump(tokens)), error_stream.as_string()) == lex(text), text
+
+
+def test_cache_matches_stream_lexer(tmp_path):
+    path = str(tmp_path / 'code.well')
+    for text in random_texts(4, 300) + [corpora.generate('declarations', 20000, 1)]:
+        with open(path, 'w') as f:
+            f.write(text)
+
+        # Lexed while streaming on the first run, loaded from the cache file on the second
+        for _ in range(2):
+            error_stream = errors.ErrorStream()
+            tokens = [token for statement in cache.statements(path, error_stream, str(tmp_path / 'cache'))
+                      for token in statement]
+            result = (None if error_stream.is_error else dump(tokens)), error_stream.as_string()
+            assert result == stream(text, 1 << 16, path)
+
+
+# Random programs for the optimizer, the expressions repeat so subexpressions can be reused
+atoms = ['1', '2.50', '3', 'x', 'y', 'z', '"ab"', 'true', 'null', 'C', 'q']
+operators = ['+', '-', '*', '/', '%', '^', 'is', 'and', 'or', '>']
+
+
+def random_expression(rng: random.Random, depth: int) -> str:
+    if depth == 0 or rng.random() < 0.3:
+        atom = rng.choice(atoms)
+        return '-' + atom if rng.random() < 0.1 else atom
+
+    expression = f'{random_expression(rng, depth - 1)} {rng.choice(operators)} {random_expression(rng, depth - 1)}'
+    return f'({expression})' if rng.random() < 0.5 else expression
+
+
+def random_programs(seed: int, count: int):
+    rng = random.Random(seed)
+    programs = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 4)):
+            expression = random_expression(rng, 3)
+            if parts and rng.random() < 0.5:
+                expression = f'{rng.choice(parts)} {rng.choice(operators[:4])} {expression}'
+            parts.append(f'x = {expression}' if rng.random() < 0.2 else expression)
+
+        programs.append('x = 2\ny = 3.5\nz = 7\nconst C = 4\n' + ' '.join(parts) + '\n' + ' '.join(parts))
+    return programs
+
+
+def run(text: str, optimize_level: int = None, buffered: bool = False):
+    # Values of each statement and the errors, or the exception it raised. The parser reads token objects or the
+    # views of a token buffer
+    error_stream = errors.ErrorStream()
+    namespace = base_types.Namespace()
+    text_lexer = lexer.Lexer('f', text, error_stream)
+    statements = text_lexer.buffer().statements() if buffered else text_lexer.statements()
+    results = []
+    try:
+        for tokens in statements:
+            result = lexer.parse_tokens(tokens, error_stream, namespace, optimize_level=optimize_level)
+            if error_stream.is_error:
+                break
+            results.append(repr(result))
+    except ArithmeticError as e:
+        results.append(type(e).__name__)
+    return results, error_stream.as_string()
+
+
+def test_optimize_levels_give_same_results():
+    for text in random_programs(1, 1000):
+        expected = run(text, 0)
+        assert run(text, 1) == expected, text
+        assert run(text, 2) == expected, text
+
+
+def test_text_and_stream_split_statements_alike():
+    # A newline outside of any group ends a statement whether the text is streamed or given at once, in a function
+    # body too
+    texts = ['x = 1 +\n2\nx', 'x = (1 +\n2)\nx', 'x = 1\ny = x * 2\ny', 'x = [1\n2]\nx', '\n\nx = 3\n\nx\n']
+    for text in texts + random_programs(8, 300):
+        error_stream = errors.ErrorStream()
+        statements = lexer.execute_stream(io.StringIO(text), 'f', error_stream, base_types.Namespace())
+        streamed = [repr(value) for result in statements for value in result]
+        expected = (None if error_stream.is_error else streamed), error_stream.as_string()
+
+        error_stream = errors.ErrorStream()
+        result = lexer.make_tokens(text, 'f', error_stream, base_types.Namespace())
+        assert (result and [repr(value) for value in result], error_stream.as_string()) == expected, text
+
+    body = base_types.Function('f', base_types.String('total = 1 +\n2'))
+    error_stream = errors.ErrorStream()
+    namespace = base_types.Namespace(functions=[body])
+    lexer.make_tokens('total = 0\nf()', 'f', error_stream, namespace)
+    assert error_stream.is_error and namespace.search_var_by_name('total').value.value == 0
+
+
+def test_function_body_follows_number_mode():
+    # The same body gives the numbers of the namespace it is called from, whatever mode it was first compiled in
+    function = base_types.Function('f', base_types.String('total = total + 0.5'))
+    for mode in (numeric.decimal_mode, numeric.int_float_mode, numeric.decimal_mode):
+        error_stream = errors.ErrorStream()
+        namespace = base_types.Namespace(functions=[function], numbers=mode)
+        lexer.make_tokens('total = 1.5\nf()', 'f', error_stream, namespace)
+        assert not error_stream.is_error
+        total = namespace.search_var_by_name('total').value.value
+        assert type(total) is type(mode.literal('2.0')) and total == 2
+
+
+def test_namespaces_keep_their_number_modes():
+    # Statements run in turn in namespaces of two modes, each one only ever sees numbers of its own mode
+    modes = numeric.decimal_mode, numeric.int_float_mode
+    namespaces = [base_types.Namespace(numbers=mode) for mode in modes]
+    for text in 'x = 1.5', 'x = x + 0.5', 'y = x / 4', 'x + y':
+        for mode, namespace in zip(modes, namespaces):
+            error_stream = errors.ErrorStream()
+            result = lexer.make_tokens(text, 'f', error_stream, namespace)
+            assert not error_stream.is_error, error_stream.as_string()
+            assert type(result[-1].value) is type(mode.literal('0.5'))
+
+    assert [lexer.make_tokens('x + y', 'f', errors.ErrorStream(), namespace)[0].value for namespace in namespaces] == [
+        numeric.decimal_mode.literal('2.5'), 2.5]
+
+    assert namespaces[1].child().numbers is numeric.int_float_mode
+    with pytest.raises(ValueError):
+        base_types.Namespace(parent=namespaces[0], numbers=numeric.int_float_mode)
+
+
+def test_number_arrays_match_numbers():
+    # Element-wise operators give what the operator gives for each pair of elements, with ints and fractions mixed
+    # in one array too. An empty array is a number array
+    pytest.importorskip('numpy')
+    rng = random.Random(6)
+    for mode in (numeric.decimal_mode, numeric.int_float_mode, numeric.int_decimal_mode):
+        for _ in range(200):
+            size = rng.randint(0, 4)
+            left = [rng.randint(-20, 20) + rng.choice([0, 0.5]) for _ in range(size)]
+            right = [rng.randint(1, 20) + rng.choice([0, 0.5]) for _ in range(size)]
+            kind = rng.choice(['+', '-', '*', '/', '%', '>', 'is'])
+
+            error_stream = errors.ErrorStream()
+            namespace = base_types.Namespace(numbers=mode)
+            text = f'[{" ".join(f"({a})" for a in left)}] {kind} [{" ".join(map(str, right))}]'
+            elements = lexer.make_tokens(text, 'f', error_stream, namespace)[0].elements
+            expected = [lexer.make_tokens(f'({a}) {kind} ({b})', 'f', error_stream, namespace)[0]
+                        for a, b in zip(left, right)]
+            assert not error_stream.is_error
+            assert [repr(element) for element in elements] == [repr(value) for value in expected], (mode, text)
+
+        namespace = base_types.Namespace(numbers=mode)
+        result = lexer.make_tokens('[1 2] is [1 2 3]', 'f', errors.ErrorStream(), namespace)
+        assert result == [base_types.shared_false]
+
+
+def test_token_buffer_views_match_tokens():
+    texts = random_texts(5, 3000) + [corpora.generate(name, 20000, 1) for name in corpora.corpora]
+    for text in texts:
+        errors_objects = errors.ErrorStream()
+        statements = lexer.Lexer('f', text, errors_objects).statements()
+        errors_buffer = errors.ErrorStream()
+        buffer = lexer.Lexer('f', text, errors_buffer).buffer()
+
+        assert [dump(tokens) for tokens in buffer.statements()] == [dump(tokens) for tokens in statements], text
+        assert errors_buffer.as_string() == errors_objects.as_string()
+
+
+def test_parser_gives_same_results_from_token_buffer():
+    for text in random_programs(7, 300):
+        assert run(text, buffered=True) == run(text), text
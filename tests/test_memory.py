@@ -0,0 +1,17 @@
+import pytest
+
+from benchmarks import corpora, memory_bench
+
+# The tokens of the multiline corpus are mostly long strings, their size is the size of the text and not of the tokens
+token_corpora = sorted(set(corpora.corpora) - {'multiline'})
+
+
+@pytest.mark.parametrize('kind', sorted(memory_bench.payloads))
+def test_values_fit_memory_limits(kind):
+    assert memory_bench.check([memory_bench.bench_values(kind, 5000)]) == []
+
+
+@pytest.mark.parametrize('corpus', token_corpora)
+def test_tokens_fit_memory_limits(corpus):
+    results = [memory_bench.bench_tokens(corpus, 1 << 15), memory_bench.bench_token_buffer(corpus, 1 << 15)]
+    assert memory_bench.check(results) == []
@@ -1,57 +1,111 @@
+import bisect
+import re
 import string
+from array import array
 
 
-class Position:
-    def __init__(self, location: str, text: str, idx=-1, col=-1, line=1):
+class SourceMap:  # The text of one source, lines are only indexed once some position needs them
+    def __init__(self, location: str, text: str, offset: int = 0, first_line: int = 1):
         self.loc = location
         self.text = text
+
+        # Where the text starts in the whole file, for a piece of a file that is streamed
+        self.offset = offset
+        self.first_line = first_line
+
+        self.__line_starts = None
+        self.__lines = {}
+
+    def __repr__(self):
+        return f'SourceMap({self.loc})'
+
+    @property
+    def line_starts(self) -> list:
+        if self.__line_starts is None:
+            starts = [0]
+            idx = self.text.find('\n')
+            while idx != -1:
+                starts.append(idx + 1)
+                idx = self.text.find('\n', idx + 1)
+            self.__line_starts = starts
+
+        return self.__line_starts
+
+    def edit(self, idx: int, deleted: int, inserted: str):  # Change the text in place, for incremental lexing
+        self.text = self.text[:idx - self.offset] + inserted + self.text[idx - self.offset + deleted:]
+        self.__line_starts = None
+        self.__lines = {}
+
+    def line_col(self, idx: int):  # Line and column of an offset in the whole file
+        idx -= self.offset
+        line = bisect.bisect_right(self.line_starts, idx)
+        return self.first_line + line - 1, idx - self.line_starts[line - 1] + 1
+
+    def line_text(self, line: int) -> str:  # Text of the line without its newline, sliced once per line
+        text = self.__lines.get(line)
+        if text is None:
+            starts = self.line_starts
+            i = line - self.first_line + 1
+            end = starts[i] - 1 if i < len(starts) else len(self.text)
+            text = self.__lines[line] = self.text[starts[i - 1]:end]
+
+        return text
+
+
+class Position:  # Offset into a file, line and column are computed when an error is rendered
+    __slots__ = 'source', 'idx'
+
+    def __init__(self, source: SourceMap, idx: int):
+        self.source = source
         self.idx = idx
-        self.col = col
-        self.line = line
-        self.char = None
-        self.advance()
 
     def __repr__(self):
         return f'Position({self.loc} {self.line}:{self.col})'
 
-    def advance(self, n: int = 1):
-        if self.idx + n >= len(self.text):
-            self.char = None
-            return
+    @property
+    def loc(self):
+        return self.source.loc
 
-        self.idx += n
-        self.char = self.text[self.idx]
+    @property
+    def text(self):
+        return self.source.text
 
-        if self.char == '\n':
-            self.col = 0
-            self.line += 1
-        else:
-            self.col += 1
+    @property
+    def line(self):
+        return self.source.line_col(self.idx)[0]
 
-    def next_char(self, n=1):
-        return None if self.idx + n >= len(self.text) else self.text[self.idx + n]
+    @property
+    def col(self):
+        return self.source.line_col(self.idx)[1]
 
     def get_line_text(self):
-        return self.text.split('\n')[self.line - 1]
+        return self.source.line_text(self.line)
 
     def copy(self):
-        return Position(self.loc, self.text, self.idx, self.col, self.line)
+        return Position(self.source, self.idx)
 
-    @staticmethod
-    def null_pos(location='', text=''): # TODO: remove
-        return Position(location, text)
 
+class Token:  # start and end are offsets into the text of the token's source
+    __slots__ = 'type', 'value', 'source', 'start_idx', 'end_idx'
 
-class Token:
-    def __init__(self, token_type: str, token_value: str, start_pos: Position, end_pos: Position):
+    def __init__(self, token_type: str, token_value: str, source: SourceMap, start: int, end: int):
         self.type = token_type
         self.value = token_value
-        self.start = start_pos
-        self.end = end_pos
+        self.source = source
+        self.start_idx = start
+        self.end_idx = end
 
     def __repr__(self):
         return f'{self.type}: {self.value}'
 
+    @property
+    def start(self):
+        return Position(self.source, self.source.offset + self.start_idx)
+
+    @property
+    def end(self):
+        return Position(self.source, self.source.offset + self.end_idx)
+
 
 class TokenTypes:
     number = 'number'
@@ -64,39 +118,338 @@ class TokenTypes:
     angle_expr = 'angle-expr'
 
 
+class WordKinds:  # Kinds of word tokens, set by the lexer so the phases compare integers instead of strings
+    name = 0
+
+    # Operators
+    plus = 1
+    minus = 2
+    star = 3
+    slash = 4
+    percent = 5
+    caret = 6
+    bigger = 7
+    smaller = 8
+    is_op = 9
+    and_op = 10
+    or_op = 11
+    not_op = 12
+
+    # Keywords
+    const = 13
+    ref = 14
+    null = 15
+    true = 16
+    false = 17
+
+    # Special chars
+    equals = 18
+    colon = 19
+    at = 20
+    dollar = 21
+    dot = 22
+    ampersand = 23
+
+
+word_kinds = {
+    '+': WordKinds.plus, '-': WordKinds.minus, '*': WordKinds.star, '/': WordKinds.slash,
+    '%': WordKinds.percent, '^': WordKinds.caret, '>': WordKinds.bigger, '<': WordKinds.smaller,
+    'is': WordKinds.is_op, 'and': WordKinds.and_op, 'or': WordKinds.or_op, 'not': WordKinds.not_op,
+
+    'const': WordKinds.const, 'ref': WordKinds.ref, 'null': WordKinds.null,
+    'true': WordKinds.true, 'false': WordKinds.false,
+
+    '=': WordKinds.equals, ':': WordKinds.colon, '@': WordKinds.at, '$': WordKinds.dollar,
+    '.': WordKinds.dot, '&': WordKinds.ampersand,
+}
+
+
+string_escapes = {'n': '\n', 't': '\t', 'b': '\b', 'f': '\f', 'r': '\r', '\\': '\\'}
+escape_pattern = re.compile(r'\\(.)', re.DOTALL)
+
+
+def number_value(text: str) -> str:  # Value of a number token from its text, 1_000. is 1000
+    if '_' in text:
+        text = text.replace('_', '')
+    return text[:-1] if text.endswith('.') else text
+
+
+def string_value(text: str, close_char: str) -> str:  # Value of a string token from the text between its quotes
+    if '\\' not in text:
+        return text
+    elif close_char == '`':  # Multi-line strings only escape their closing char
+        return escape_pattern.sub(lambda m: m[1] if m[1] == close_char else m[0], text)
+
+    return escape_pattern.sub(lambda m: close_char if m[1] == close_char else string_escapes.get(m[1], m[0]), text)
+
+
 class StringToken(Token):
-    def __init__(self, value: str, start_pos: Position, end_pos: Position):
-        super().__init__(TokenTypes.string, value, start_pos, end_pos)
+    __slots__ = ()
+
+    def __init__(self, value: str, source: SourceMap, start: int, end: int):
+        super().__init__(TokenTypes.string, value, source, start, end)
 
 
 class NumberToken(Token):
-    def __init__(self, value: str, start_pos: Position, end_pos: Position):
-        super().__init__(TokenTypes.number, value, start_pos, end_pos)
+    __slots__ = ()
+
+    def __init__(self, value: str, source: SourceMap, start: int, end: int):
+        super().__init__(TokenTypes.number, value, source, start, end)
 
 
 class WordToken(Token):
-    def __init__(self, value: str, start_pos: Position, end_pos: Position):
-        super().__init__(TokenTypes.word, value, start_pos, end_pos)
+    __slots__ = 'kind',
+
+    def __init__(self, value: str, source: SourceMap, start: int, end: int):
+        super().__init__(TokenTypes.word, value, source, start, end)
+        self.kind = word_kinds.get(value, WordKinds.name)
+
+
+class GroupToken(Token):  # Token of a (), [], {} or <> expression, holds the already lexed tokens inside it
+    __slots__ = 'children',
+
+    def __init__(self, token_type: str, children: list, source: SourceMap, start: int, end: int):
+        self.type = token_type
+        self.children = children
+        self.source = source
+        self.start_idx = start
+        self.end_idx = end
+
+    @property
+    def value(self):  # The source text between the brackets, it is never lexed again
+        return self.source.text[self.start_idx + 1:self.end_idx - 1]
+
+    def __repr__(self):
+        return f'{self.type}: {self.children}'
+
+
+class ParenExprToken(GroupToken):
+    __slots__ = ()
+
+    def __init__(self, children: list, source: SourceMap, start: int, end: int):
+        super().__init__(TokenTypes.paren_expr, children, source, start, end)
+
+
+class BraceExprToken(GroupToken):
+    __slots__ = ()
+
+    def __init__(self, children: list, source: SourceMap, start: int, end: int):
+        super().__init__(TokenTypes.brace_expr, children, source, start, end)
+
+
+class BracketExprToken(GroupToken):
+    __slots__ = ()
+
+    def __init__(self, children: list, source: SourceMap, start: int, end: int):
+        super().__init__(TokenTypes.bracket_expr, children, source, start, end)
+
+
+class AngleExprToken(GroupToken):
+    __slots__ = ()
+
+    def __init__(self, children: list, source: SourceMap, start: int, end: int):
+        super().__init__(TokenTypes.angle_expr, children, source, start, end)
+
+
+# Token classes as small integers, for the compact form of token lists written by encode_tokens
+token_classes = [NumberToken, StringToken, WordToken, ParenExprToken, BraceExprToken, BracketExprToken, AngleExprToken]
+token_codes = {cls: code for code, cls in enumerate(token_classes)}
+token_types = [TokenTypes.number, TokenTypes.string, TokenTypes.word, TokenTypes.paren_expr, TokenTypes.brace_expr,
+               TokenTypes.bracket_expr, TokenTypes.angle_expr]
+for code, cls in enumerate(token_classes):  # The parser tells tokens and token views apart by their code
+    cls.code = code
+word_code = token_codes[WordToken]
+number_code = token_codes[NumberToken]
+string_code = token_codes[StringToken]
+first_group_code = token_codes[ParenExprToken]
+
+
+def encode_tokens(tokens: list, codes, positions, counts):
+    # Tokens are written in order with the children of a group after it: the class code of every token, its start
+    # and end in the whole file, and the number of children of each group. Values are made from the source again
+    for token in tokens:
+        code = token_codes[type(token)]
+        codes.append(code)
+        positions.append(token.source.offset + token.start_idx)
+        positions.append(token.source.offset + token.end_idx)
+
+        if code >= first_group_code:
+            counts.append(len(token.children))
+            encode_tokens(token.children, codes, positions, counts)
+
+
+def decode_tokens(lengths, codes, positions, counts, source: SourceMap):
+    # Yields the statements written by encode_tokens one at a time, lengths are their numbers of top-level tokens
+    text = source.text
+    offset = source.offset
+    positions = iter(positions)
+    items = zip(codes, positions, positions)
+    counts = iter(counts)
+
+    for length in lengths:
+        tokens = statement = []
+        groups = []  # Outer token lists of the groups being filled, with how many tokens they still miss
+        remaining = length
+
+        while remaining or groups:
+            if not remaining:
+                tokens, remaining = groups.pop()
+                continue
+
+            remaining -= 1
+            code, start, end = next(items)
+            start -= offset
+            end -= offset
+
+            if code == word_code:
+                tokens.append(WordToken(text[start:end], source, start, end))
+            elif code == number_code:
+                tokens.append(NumberToken(number_value(text[start:end]), source, start, end))
+            elif code == string_code:
+                tokens.append(StringToken(string_value(text[start + 1:end - 1], text[start]), source, start, end))
+            else:
+                children = []
+                tokens.append(token_classes[code](children, source, start, end))
+                count = next(counts)
+                if count:
+                    groups.append((tokens, remaining))
+                    tokens, remaining = children, count
+
+        yield statement
+
+
+class TokenBuffer:  # Tokens of a source as parallel arrays instead of token objects, a few bytes per token
+    def __init__(self, source: SourceMap):
+        self.source = source
+
+        # One item per token, in the order of encode_tokens. start and end are offsets into the text of source,
+        # value is the kind of a word or the index of the token after a group. The values of the tokens are
+        # made again from the source when they are read, so no string is kept for them
+        self.codes = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.values = array('I')
+
+        # Index of the first token of each top-level statement
+        self.statement_starts = array('I')
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __repr__(self):
+        return f'TokenBuffer({self.source.loc}, {len(self)} tokens)'
+
+    def add_statement(self, tokens: list):
+        self.statement_starts.append(len(self.codes))
+        self.add_tokens(tokens)
+
+    def add_tokens(self, tokens: list):
+        for token in tokens:
+            code = token.code
+            idx = len(self.codes)
+            self.codes.append(code)
+            self.starts.append(token.start_idx)
+            self.ends.append(token.end_idx)
+
+            if code >= first_group_code:
+                self.values.append(0)
+                self.add_tokens(token.children)
+                self.values[idx] = len(self.codes)
+            else:
+                self.values.append(token.kind if code == word_code else 0)
+
+    def value(self, idx: int) -> str:
+        code = self.codes[idx]
+        text = self.source.text
+        start = self.starts[idx]
+        end = self.ends[idx]
+
+        if code == word_code:
+            return text[start:end]
+        elif code == number_code:
+            return number_value(text[start:end])
+        elif code == string_code:
+            return string_value(text[start + 1:end - 1], text[start])
+
+        return text[start + 1:end - 1]  # The source text between the brackets of a group
+
+    def statements(self):  # Yields the token lists of the top-level statements, their views are made one at a time
+        starts = self.statement_starts
+        for i, start in enumerate(starts):
+            yield TokenList(self, start, starts[i + 1] if i + 1 < len(starts) else len(self.codes))
+
+
+class TokenList:  # The tokens of a buffer from first up to end, without the tokens inside of groups
+    __slots__ = 'views',
+
+    def __init__(self, buffer: TokenBuffer, first: int, end: int):
+        # The views live as long as the list, a parser only keeps the list of the statement it parses
+        views = self.views = []
+        codes = buffer.codes
+        values = buffer.values
+        while first < end:
+            code = codes[first]
+            views.append(TokenView(buffer, first, code, values[first]))
+            first = values[first] if code >= first_group_code else first + 1
+
+    def __len__(self):
+        return len(self.views)
+
+    def __getitem__(self, k: int):
+        return self.views[k]
+
+    def __iter__(self):
+        return iter(self.views)
+
+    def __repr__(self):
+        return f'[{", ".join([token.__repr__() for token in self])}]'
+
+
+class TokenView:  # Reads one token of a buffer with the attributes of a token object
+    __slots__ = 'buffer', 'idx', 'code', 'kind'
+
+    def __init__(self, buffer: TokenBuffer, idx: int, code: int, value: int):
+        self.buffer = buffer
+        self.idx = idx
+        self.code = code
+        self.kind = value if code == word_code else None
+
+    def __repr__(self):
+        if self.code >= first_group_code:
+            return f'{self.type}: {self.children}'
+        return f'{self.type}: {self.value}'
 
+    @property
+    def type(self):
+        return token_types[self.code]
 
-class ParenExprToken(Token):
-    def __init__(self, value: str, start_pos: Position, end_pos: Position):
-        super().__init__(TokenTypes.paren_expr, value, start_pos, end_pos)
+    @property
+    def value(self):
+        return self.buffer.value(self.idx)
 
+    @property
+    def children(self):
+        return TokenList(self.buffer, self.idx + 1, self.buffer.values[self.idx])
 
-class BraceExprToken(Token):
-    def __init__(self, value: str, start_pos: Position, end_pos: Position):
-        super().__init__(TokenTypes.brace_expr, value, start_pos, end_pos)
+    @property
+    def source(self):
+        return self.buffer.source
 
+    @property
+    def start_idx(self):
+        return self.buffer.starts[self.idx]
 
-class BracketExprToken(Token):
-    def __init__(self, value: str, start_pos: Position, end_pos: Position):
-        super().__init__(TokenTypes.bracket_expr, value, start_pos, end_pos)
+    @property
+    def end_idx(self):
+        return self.buffer.ends[self.idx]
 
+    @property
+    def start(self):
+        return Position(self.source, self.source.offset + self.start_idx)
 
-class AngleExprToken(Token):
-    def __init__(self, value: str, start_pos: Position, end_pos: Position):
-        super().__init__(TokenTypes.angle_expr, value, start_pos, end_pos)
+    @property
+    def end(self):
+        return Position(self.source, self.source.offset + self.end_idx)
 
 
 class Triggers:
@@ -105,6 +458,17 @@ class Triggers:
     paren_expr = '(', ')'
     angle_expr = '<', '>'
 
+    groups = {
+        paren_expr[0]: (ParenExprToken, paren_expr),
+        bracket_expr[0]: (BracketExprToken, bracket_expr),
+        brace_expr[0]: (BraceExprToken, brace_expr),
+        angle_expr[0]: (AngleExprToken, angle_expr),
+    }
+    open_chars = ''.join(groups)
+    close_chars = ''.join(open_close[1] for _, open_close in groups.values())
+
+    whitespace = ' \r\t\n'
+    string_chars = '"\'`'
     dot_digits = '.' + string.digits
     comment_char = '#'
 
@@ -0,0 +1,175 @@
+import arrays
+import base_types
+import lexer
+import numeric
+from base_types import *
+from compiler import Code, OpCodes
+from errors import *
+
+
+class VM:  # Stack machine that runs the code made by compiler.Compiler
+    def __init__(self, error_stream: ErrorStream, namespace: base_types.Namespace):
+        self.error_stream = error_stream
+        self.namespace = namespace
+
+    def run(self, code: Code):  # Values left on the stack, which are the values of the statement, None after an error
+        stack = []
+        temps = [None] * code.temps
+        constants = code.constants
+        names = code.names
+        namespace = self.namespace
+
+        # The variable or constant each name slot of the code refers to, looked up in the namespace on first use.
+        # Only the stores of this code can change what a name refers to, calls declare names in their own scope
+        cells = [None] * len(names)
+
+        for i, (op, arg) in enumerate(code.instructions):
+            if op == OpCodes.load_const:
+                stack.append(constants[arg])
+
+            elif op == OpCodes.binary_op:
+                right = stack.pop()
+                left = stack.pop()
+                func = binary_operations.get((type(left), arg, type(right)))
+                result = func(left, right) if func else None
+
+                if isinstance(result, Error):
+                    self.error_stream.add_error(result)
+                    return None
+                elif not result:
+                    node = code.nodes[i]
+                    self.error_stream.add_error(UnsupportedOperationException(
+                        f'Unsupported operation {node.op} between types {left.type_name} and {right.type_name}',
+                        node.left.span[0], node.right.span[1]
+                    ))
+                    return None
+                stack.append(result)
+
+            elif op == OpCodes.load_name:
+                var = cells[arg]
+                if var is None:
+                    var = cells[arg] = namespace.search_not_func(names[arg])
+                if not var:
+                    node = code.nodes[i]
+                    self.error_stream.add_error(UndefinedErrorException(
+                        f'Name \'{names[arg]}\' is not defined',
+                        node.start, node.end, 'while getting value of name'
+                    ))
+                    return None
+                stack.append(var.value)
+
+            elif op == OpCodes.unary_op:
+                right = stack.pop()
+                func = unary_operations.get((type(right), arg))
+                result = func(right) if func else None
+
+                if isinstance(result, Error):
+                    self.error_stream.add_error(result)
+                    return None
+                elif not result:
+                    node = code.nodes[i]
+                    self.error_stream.add_error(UnsupportedOperationException(
+                        f'Unsupported unary operator {node.op} for type {right.type_name}',
+                        node.start, node.operand.span[1]
+                    ))
+                    return None
+                stack.append(result)
+
+            elif op == OpCodes.load_temp:
+                stack.append(temps[arg])
+
+            elif op == OpCodes.store_temp:
+                temps[arg] = stack[-1]
+
+            elif op == OpCodes.store_name:
+                var = cells[arg] or namespace.search_not_func(names[arg])
+                if not self.check_not_const(var, code.nodes[i].name):
+                    return None
+
+                if var:
+                    var.value = stack[-1]
+                else:
+                    var = Variable(names[arg], stack[-1])
+                    namespace.add_var(var)
+                cells[arg] = var
+
+            elif op == OpCodes.build_array:
+                elements = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                stack.append(arrays.to_array(elements))
+
+            elif op == OpCodes.store_const:
+                if not self.check_not_const(cells[arg] or namespace.search_not_func(names[arg]), code.nodes[i].name,
+                                            is_const=True):
+                    return None
+
+                namespace.remove_by_name(names[arg])
+                cells[arg] = Constant(names[arg], stack[-1])
+                namespace.add_const(cells[arg])
+
+            elif op == OpCodes.store_ref:
+                var = cells[arg]
+                if var is None:
+                    var = cells[arg] = namespace.search_not_func(names[arg])
+                if not isinstance(var, Variable):
+                    reference = code.nodes[i].reference
+                    self.error_stream.add_error(ValueErrorException(
+                        f'Cannot assign to reference that refers to an undefined object'
+                        if not var else
+                        f'Cannot assign to constant {names[arg]} through a reference',
+                        reference.start, reference.end,
+                        'while assigning to reference'
+                    ))
+                    return None
+                var.value = stack[-1]
+
+            elif op == OpCodes.get_property:
+                value = stack.pop()
+                get_prop = value.properties.search_by_name(names[arg])
+                if not get_prop:
+                    self.error_stream.add_error(ValueErrorException(
+                        f'Object type {value.type_name} does not have property  \'{names[arg]}\'',
+                        code.nodes[i].value.span[0], code.nodes[i].end, 'while getting property of object'
+                    ))
+                    return None
+                stack.append(get_prop.value)
+
+            elif op == OpCodes.call:
+                node = code.nodes[i]
+                get_func: Function = namespace.search_func_by_name(names[arg])
+                if not get_func:
+                    self.error_stream.add_error(UndefinedErrorException(
+                        f'Name \'{names[arg]}\' is not defined',
+                        node.start, node.end, 'when function call was found'
+                    ))
+                    return None
+
+                # The body is lexed and compiled on the first call only, and again when it is called from a namespace
+                # in another number mode, as its literals are numbers of the mode it was compiled in
+                body = get_func.compiled
+                if body is None or get_func.compiled_mode is not numeric.current:
+                    body = get_func.compiled = lexer.compile_command(get_func.code.value, node.start.loc,
+                                                                     self.error_stream)
+                    get_func.compiled_mode = numeric.current
+                    if body is None:
+                        return None
+
+                # TODO: function accepts arguments
+                scope = namespace.child()
+                for statement in body:
+                    VM(self.error_stream, scope).run(statement)
+                    if self.error_stream.is_error:
+                        return None
+                stack.append(shared_null)
+
+        return stack
+
+    def check_not_const(self, var, name, is_const=False):  # var is what the name refers to now
+        if isinstance(var, Constant):
+            self.error_stream.add_error(ValueErrorException(
+                f'Name {name.name} is already taken by a constant',
+                name.start, name.end, 'when declaring ' + ('constant' if is_const else 'variable')
+            ))
+            return False
+
+        return True